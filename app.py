@@ -5,8 +5,8 @@ Aplicación para monitorear las 7 grandes tecnológicas del NASDAQ
 
 import streamlit as st
 import streamlit.components.v1 as components
-import yfinance as yf
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
@@ -14,7 +14,17 @@ from datetime import datetime, timedelta
 import json
 import os
 import base64
+import logging
 import pytz
+import market_calendar
+import market_data
+from caching import EpochCache
+import display_time
+from downsample import lttb_indices
+from poller import MarketDataPoller
+from price_matrix import PriceMatrix
+import symbol_index
+import universe
 
 # Configuración de la página
 st.set_page_config(
@@ -510,20 +520,31 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Definición de las acciones Magnificent Seven con colores únicos y distintivos
-MAGNIFICENT_SEVEN = {
-    "GOOGL": {"name": "Alphabet (Google)", "emoji": "🔍", "color": "#5C9CE5"},  # Azul Google
-    "AMZN": {"name": "Amazon", "emoji": "📦", "color": "#FF9F43"},              # Naranja Amazon
-    "AAPL": {"name": "Apple", "emoji": "🍎", "color": "#A3A8B8"},               # Gris elegante Apple
-    "META": {"name": "Meta (Facebook)", "emoji": "👤", "color": "#0A84FF"},     # Azul Meta
-    "MSFT": {"name": "Microsoft", "emoji": "🪟", "color": "#00D2D3"},           # Turquesa Microsoft
-    "NVDA": {"name": "NVIDIA", "emoji": "🎮", "color": "#78C850"},              # Verde NVIDIA
-    "TSLA": {"name": "Tesla", "emoji": "🚗", "color": "#E84545"}                # Rojo Tesla
-}
+# Símbolos del resumen por página (las listas grandes se paginan)
+SUMMARY_PAGE_SIZE = 14
+
+# Posiciones que se muestran en el ranking de rendimiento
+RANKING_SIZE = 20
+
+# Puntos como mucho por serie de los gráficos según la pantalla (el resto se reduce con LTTB)
+CHART_POINTS_MOBILE = 400
+CHART_POINTS_DESKTOP = 1200
+
+# Gráficos con más puntos que estos (sumando todas las series) se dibujan con WebGL
+WEBGL_POINTS_THRESHOLD = 4000
+
+# Figuras de Plotly que se reutilizan mientras no cambien los datos (las menos usadas se descartan)
+FIGURE_CACHE_ENTRIES = 64
 
 PORTFOLIO_FILE = "portfolio.json"
 ALERTS_FILE = "alerts.json"
 
+# Intervalo de la actualización automática con el mercado abierto (segundos)
+AUTO_REFRESH_SECONDS = 300
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+logger = logging.getLogger("nasdaq_web")
+
 
 def load_portfolio():
     """Cargar portfolio desde archivo JSON"""
@@ -573,47 +594,165 @@ def export_data_button(data, filename, button_text, key):
     )
 
 
-@st.cache_data(ttl=300)  # Cache de 5 minutos
-def get_stock_data(symbols, period="1mo"):
-    """Obtener datos de acciones"""
-    data = {}
-    for symbol in symbols:
-        try:
-            ticker = yf.Ticker(symbol)
-            
-            # Para períodos cortos, usar intervalos intradía
-            if period == "1d":
-                # Obtener datos intradía con intervalo de 5 minutos
-                hist = ticker.history(period="1d", interval="5m")
-                # Si no hay datos del día actual (mercado cerrado), obtener último día de trading
-                if len(hist) == 0:
-                    hist = ticker.history(period="5d", interval="5m")
-                    # Filtrar para mostrar solo el último día con datos
-                    if len(hist) > 0:
-                        last_date = hist.index[-1].date()
-                        hist = hist[hist.index.date == last_date]
-            elif period == "5d":
-                # Para 5 días, usar intervalo de 15 minutos
-                hist = ticker.history(period="5d", interval="15m")
-            else:
-                hist = ticker.history(period=period)
-            
-            info = ticker.info
-            data[symbol] = {
-                "history": hist,
-                "info": info,
-                "current_price": hist['Close'].iloc[-1] if len(hist) > 0 else 0,
-                "prev_close": info.get('previousClose', hist['Close'].iloc[-2] if len(hist) > 1 else 0),
-                "market_cap": info.get('marketCap', 0),
-                "volume": info.get('volume', 0),
-                "pe_ratio": info.get('trailingPE', 0),
-                "52w_high": info.get('fiftyTwoWeekHigh', 0),
-                "52w_low": info.get('fiftyTwoWeekLow', 0)
-            }
-        except Exception as e:
-            st.error(f"Error obteniendo datos de {symbol}: {e}")
-            data[symbol] = None
-    return data
+@st.cache_resource
+def get_universe():
+    """Watchlists y metadatos de los símbolos (ver universe.py)"""
+    return universe.load_universe()
+
+
+@st.cache_resource
+def get_symbol_index():
+    """Índice local de símbolos para buscar por ticker o empresa (ver symbol_index.py)"""
+    # Los símbolos de las watchlists se pueden buscar aunque no estén en el listado
+    listed = {symbol for symbols in get_universe().watchlists.values() for symbol in symbols}
+    extra = [(symbol, get_universe().info(symbol)["name"], "") for symbol in sorted(listed)]
+    return symbol_index.load_index(extra=extra)
+
+
+def symbol_info(symbol):
+    """Nombre, emoji y color de un símbolo (el nombre del listado si no está en ninguna lista)"""
+    info = get_universe().info(symbol)
+    if info["name"] == symbol:
+        listing = get_symbol_index().get(symbol)
+        if listing:
+            info = dict(info, name=listing[1])
+    return info
+
+
+def symbol_label(symbol):
+    """Texto de un símbolo en los selectores: símbolo y nombre"""
+    name = symbol_info(symbol)["name"]
+    return symbol if name == symbol else f"{symbol} - {name}"
+
+
+def symbol_picker(label, options, key):
+    """Selector de símbolo: los de la watchlist o, si se escribe algo, los del índice local"""
+    query = st.text_input("🔎 Buscar ticker o empresa", key=f"{key}_query",
+                          placeholder="Ej.: AAPL, micro, bank...")
+    if query:
+        options = [symbol for symbol, _, _ in get_symbol_index().search(query)]
+        if not options:
+            st.caption(f"Sin resultados para «{query}»")
+            return None
+    # Al cambiar la búsqueda, la selección anterior puede no estar entre las opciones
+    if options and st.session_state.get(key) not in options:
+        st.session_state[key] = options[0]
+    return st.selectbox(label, options=options, format_func=symbol_label, key=key)
+
+
+def picked_quote(stock_data, symbol):
+    """Cotización de un símbolo elegido en un buscador
+
+    En el primer rerun tras elegirlo todavía no está entre las cotizaciones cargadas
+    (quote_symbols se calcula antes del buscador), así que entonces se pide aparte.
+    """
+    if symbol is None:
+        return None
+    if symbol not in stock_data:
+        return get_stock_data([symbol], market_data.QUOTES)[symbol]
+    return stock_data[symbol]
+
+
+@st.cache_resource
+def get_poller():
+    """Sondeo de datos de mercado único para todo el proceso (todas las sesiones)"""
+    poller = MarketDataPoller(
+        get_universe().symbols(),
+        market_data.load_view,
+        interval=lambda: market_calendar.seconds_until_refresh(AUTO_REFRESH_SECONDS),
+        retry_interval=market_data.NEGATIVE_TTL,
+        active=market_calendar.is_active
+    )
+    poller.start()
+    return poller
+
+
+@st.cache_resource
+def get_figure_cache():
+    """Caché LRU de figuras compartida por todas las sesiones"""
+    return EpochCache(max_entries=FIGURE_CACHE_ENTRIES)
+
+
+def cached_figure(key, build, version):
+    """Figura de un gráfico reutilizada mientras no cambien los datos que dibuja
+    
+    key identifica el gráfico (tipo, símbolos, período...) y version es la de la vista
+    del sondeo que lee (poller.version), leída antes de obtener los datos, así que una
+    figura nunca vale para datos más nuevos que los suyos y no se invalida cuando se
+    actualizan otras vistas. Las figuras se comparten y no se modifican después de crearlas.
+    """
+    return get_figure_cache().get(key, build, version)
+
+
+def chart_point_budget():
+    """Puntos por serie para la pantalla del usuario (móvil o escritorio, por el User-Agent)"""
+    user_agent = st.context.headers.get("User-Agent", "")
+    mobile = any(token in user_agent for token in ("Mobi", "Android", "iPhone", "iPad"))
+    return CHART_POINTS_MOBILE if mobile else CHART_POINTS_DESKTOP
+
+
+def get_display_tz():
+    """Zona horaria elegida por el usuario para las horas de los gráficos y del mercado"""
+    return pytz.timezone(st.session_state.get("display_tz", market_calendar.DISPLAY_TZ.zone))
+
+
+def get_stock_data(symbols, period="1mo", interval=None):
+    """Obtener datos de acciones del último snapshot del sondeo
+    
+    Solo la primera lectura de un período espera a la red; después el sondeo lo
+    mantiene actualizado en segundo plano para todas las sesiones. Con un intervalo
+    distinto del de por defecto, el histórico se remuestrea en local desde las barras
+    de 1 minuto ya cacheadas.
+    """
+    poller = get_poller()
+    try:
+        version = poller.version(period, symbols)
+        data = poller.get(period, symbols)
+        if interval is None or interval == market_data.DEFAULT_INTERVALS.get(period):
+            return {symbol: data.get(symbol) for symbol in symbols}
+        # Remuestreo calculado una sola vez por versión de los datos y compartido
+        return poller.view(
+            (tuple(symbols), period, interval),
+            lambda: with_histories(data, market_data.get_price_history(symbols, period, interval)),
+            version
+        )
+    except Exception as e:
+        st.error(f"Error obteniendo históricos: {e}")
+        return {symbol: None for symbol in symbols}
+
+
+def get_price_matrix(symbols, period):
+    """Matriz de cierres alineada de unos símbolos (ver price_matrix.py)
+    
+    Solo necesita los históricos (sin fundamentales), así que se puede montar con la
+    lista completa. Se construye una sola vez por versión de los históricos y se
+    comparte entre sesiones.
+    """
+    poller = get_poller()
+    view = market_data.history_view(period)
+    version = poller.version(view, symbols)
+    try:
+        data = poller.get(view, symbols)
+    except Exception as e:
+        st.error(f"Error obteniendo históricos: {e}")
+        data = {}
+    return poller.view(
+        (tuple(symbols), period, "matriz"),
+        lambda: PriceMatrix.from_data(data, symbols),
+        version
+    )
+
+
+def with_histories(data, histories):
+    """Datos de acciones con otros históricos (sin copiar el resto de campos)
+
+    Los símbolos sin datos o cuyo histórico ha fallado (una excepción) quedan a None.
+    """
+    return {
+        symbol: {**data[symbol], "history": hist}
+        if data.get(symbol) and not isinstance(hist, Exception) else None
+        for symbol, hist in histories.items()
+    }
 
 
 def calculate_change(current, previous):
@@ -639,33 +778,69 @@ def get_change_color(change):
     return COLORS["up"] if change >= 0 else COLORS["down"]
 
 
-def create_price_chart(data, symbols, title="Evolución de Precios", period="1mo"):
-    """Crear gráfico de evolución de precios - Color único por acción"""
+def market_hours_text(tz=market_calendar.DISPLAY_TZ):
+    """Horario de la próxima sesión (o la actual) en la zona horaria indicada"""
+    now = datetime.now(market_calendar.EXCHANGE_TZ)
+    day = now.date() if market_calendar.is_trading_day(now.date()) else market_calendar.next_open(now).date()
+    market_open, market_close = market_calendar.session_in_tz(day, tz)
+    label = display_time.DISPLAY_TIMEZONES.get(tz.zone, tz.zone)
+    return f"El mercado NASDAQ opera de {market_open:%H:%M} a {market_close:%H:%M} (hora {label})."
+
+
+def series_arrays(ts, times, values, max_points):
+    """x e y de una serie como arrays NumPy, que Plotly envía en binario (no como listas JSON)
+    
+    ts son las marcas de tiempo en ns (para reducir la serie con LTTB a max_points
+    puntos) y times las mismas en milisegundos de la hora que se muestra, ya calculadas
+    (ver display_time.py): solo se seleccionan los puntos que se conservan.
+    """
+    keep = lttb_indices(ts, values, max_points)
+    return times[keep], np.asarray(values, dtype="float32")[keep]
+
+
+def line_traces(traces):
+    """Trazas de línea: Scattergl (WebGL) si el gráfico tiene muchos puntos, Scatter si no"""
+    points = sum(len(trace["y"]) for trace in traces)
+    trace_type = go.Scattergl if points > WEBGL_POINTS_THRESHOLD else go.Scatter
+    return [trace_type(**trace) for trace in traces]
+
+
+def create_price_chart(data, symbols, title="Evolución de Precios", period="1mo", max_points=None,
+                       tz=market_calendar.DISPLAY_TZ):
+    """Crear gráfico de evolución de precios - Color único por acción
+    
+    Los períodos cortos se muestran en la hora de tz. Con max_points, cada serie se
+    reduce con LTTB a como mucho ese número de puntos.
+    """
     fig = go.Figure()
+    traces = []
     
     has_data = False
     reference_date = None
-    spain_tz = pytz.timezone('Europe/Madrid')
+    # Hora de tz para períodos cortos; fechas de la bolsa en el resto
+    x_tz = tz if period in ["1d", "5d"] else None
     
     for symbol in symbols:
         if data[symbol] and len(data[symbol]["history"]) > 0:
             has_data = True
-            hist = data[symbol]["history"].copy()
+            # El histórico es compartido por todas las sesiones: no se copia ni se modifica
+            hist = data[symbol]["history"]
             first_price = hist['Close'].iloc[0]
             last_price = hist['Close'].iloc[-1]
             change = ((last_price - first_price) / first_price) * 100
             # Usar el color único de cada acción
-            line_color = MAGNIFICENT_SEVEN[symbol]['color']
+            line_color = symbol_info(symbol)['color']
             # Indicador de subida/bajada en el nombre
             arrow = "▲" if change >= 0 else "▼"
             
-            # Convertir a hora española para períodos cortos
-            if period in ["1d", "5d"]:
-                hist.index = hist.index.tz_convert(spain_tz)
+            # Puntos que se envían al navegador (reducidos conservando la forma), con las
+            # horas ya convertidas a la zona que se muestra
+            times = display_time.series_times(hist, x_tz)
+            x_values, y_values = series_arrays(hist.index.asi8, times, hist['Close'], max_points)
             
             # Guardar fecha de referencia para el rango del eje X
             if reference_date is None and period == "1d":
-                reference_date = hist.index[-1].date()
+                reference_date = pd.Timestamp(x_values[-1], unit="ms").date()
             
             # Formato de hover según período
             if period in ["1d", "5d"]:
@@ -677,24 +852,24 @@ def create_price_chart(data, symbols, title="Evolución de Precios", period="1mo
                                  "Fecha: %{x|%d/%m/%Y}<br>" +
                                  "Precio: $%{y:.2f}<extra></extra>")
             
-            fig.add_trace(go.Scatter(
-                x=hist.index,
-                y=hist['Close'],
+            traces.append(dict(
+                x=x_values,
+                y=y_values,
                 mode='lines',
                 name=f"{symbol} {arrow} {change:+.1f}%",
                 line=dict(color=line_color, width=3),
                 hovertemplate=hover_template
             ))
     
+    fig.add_traces(line_traces(traces))
+    
     # Configurar formato del eje X según período
     if period == "1d":
-        # Para 1D: mostrar rango completo 15:30-22:00 hora España
-        if reference_date:
-            # Rango en hora española
-            market_open = datetime.combine(reference_date, datetime.strptime("15:30", "%H:%M").time())
-            market_close = datetime.combine(reference_date, datetime.strptime("22:00", "%H:%M").time())
-            market_open = spain_tz.localize(market_open)
-            market_close = spain_tz.localize(market_close)
+        # Para 1D: mostrar la sesión completa en la hora que se muestra (según calendario),
+        # sin zona horaria como las x
+        session = market_calendar.session_in_tz(reference_date, tz) if reference_date else None
+        if session:
+            market_open, market_close = (t.replace(tzinfo=None) for t in session)
             
             xaxis_config = dict(
                 showgrid=True,
@@ -763,11 +938,13 @@ def create_price_chart(data, symbols, title="Evolución de Precios", period="1mo
         margin=dict(l=10, r=10, t=50, b=10),
         autosize=True
     )
+    # Las x se envían como milisegundos: el eje tiene que ser de fechas
+    fig.update_xaxes(type='date')
     
     # Mensaje si no hay datos
     if not has_data:
         fig.add_annotation(
-            text="No hay datos disponibles para este período.<br>El mercado NASDAQ opera de 15:30 a 22:00 (hora España).",
+            text=f"No hay datos disponibles para este período.<br>{market_hours_text(tz)}",
             xref="paper", yref="paper",
             x=0.5, y=0.5,
             showarrow=False,
@@ -778,69 +955,76 @@ def create_price_chart(data, symbols, title="Evolución de Precios", period="1mo
     return fig
 
 
-def create_comparison_chart(data, symbols, period="1mo"):
-    """Crear gráfico de comparación normalizado - Color único por acción"""
+def create_comparison_chart(matrix, period="1mo", max_points=None, tz=market_calendar.DISPLAY_TZ, symbols=None):
+    """Crear gráfico de comparación normalizado - Color único por acción
+    
+    Los rendimientos salen de la matriz de precios (PriceMatrix), ya normalizados, y los
+    períodos cortos se muestran en la hora de tz. Con symbols solo se dibujan esos
+    símbolos de la matriz. Con max_points, cada serie se reduce con LTTB a como mucho
+    ese número de puntos.
+    """
     fig = go.Figure()
+    traces = []
     
-    has_data = False
+    columns = [(symbol, change) for symbol, change in zip(matrix.symbols, matrix.change)
+               if symbols is None or symbol in symbols]
+    has_data = len(columns) > 0
     reference_date = None
-    spain_tz = pytz.timezone('Europe/Madrid')
+    # Hora de tz para períodos cortos; fechas de la bolsa en el resto
+    ts = matrix.index.asi8
+    times = display_time.series_times(matrix, tz if period in ["1d", "5d"] else None)
     
-    for symbol in symbols:
-        if data[symbol] and len(data[symbol]["history"]) > 0:
-            has_data = True
-            hist = data[symbol]["history"].copy()
-            # Normalizar a porcentaje desde el inicio
-            normalized = (hist['Close'] / hist['Close'].iloc[0] - 1) * 100
-            final_change = normalized.iloc[-1]
-            
-            # Convertir a hora española para períodos cortos
-            if period in ["1d", "5d"]:
-                hist.index = hist.index.tz_convert(spain_tz)
-            
-            # Guardar fecha de referencia para el rango del eje X
-            if reference_date is None and period == "1d":
-                reference_date = hist.index[-1].date()
-            
-            # Usar el color único de cada acción
-            line_color = MAGNIFICENT_SEVEN[symbol]['color']
-            # Crear color de relleno con transparencia
-            hex_color = line_color.lstrip('#')
-            r, g, b = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-            fill_color = f"rgba({r}, {g}, {b}, 0.15)"
-            
-            arrow = "▲" if final_change >= 0 else "▼"
-            
-            # Formato de hover según período
-            if period in ["1d", "5d"]:
-                hover_template = (f"<b>{symbol}</b><br>" +
-                                 "Hora: %{x|%H:%M}<br>" +
-                                 "Cambio: %{y:.2f}%<extra></extra>")
-            else:
-                hover_template = (f"<b>{symbol}</b><br>" +
-                                 "Fecha: %{x|%d/%m/%Y}<br>" +
-                                 "Cambio: %{y:.2f}%<extra></extra>")
-            
-            fig.add_trace(go.Scatter(
-                x=hist.index,
-                y=normalized,
-                mode='lines',
-                name=f"{symbol} {arrow} {final_change:+.1f}%",
-                line=dict(color=line_color, width=3),
-                fill='tozeroy',
-                fillcolor=fill_color,
-                hovertemplate=hover_template
-            ))
+    for symbol, final_change in columns:
+        # Rendimiento (%) desde el inicio, solo en las barras del símbolo
+        rows, normalized = matrix.column(symbol)
+        
+        # Puntos que se envían al navegador (reducidos conservando la forma), con las
+        # horas ya convertidas a la zona que se muestra
+        x_values, normalized = series_arrays(ts[rows], times[rows], normalized, max_points)
+        
+        # Guardar fecha de referencia para el rango del eje X
+        if reference_date is None and period == "1d":
+            reference_date = pd.Timestamp(x_values[-1], unit="ms").date()
+        
+        # Usar el color único de cada acción
+        line_color = symbol_info(symbol)['color']
+        # Crear color de relleno con transparencia
+        hex_color = line_color.lstrip('#')
+        r, g, b = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+        fill_color = f"rgba({r}, {g}, {b}, 0.15)"
+        
+        arrow = "▲" if final_change >= 0 else "▼"
+        
+        # Formato de hover según período
+        if period in ["1d", "5d"]:
+            hover_template = (f"<b>{symbol}</b><br>" +
+                             "Hora: %{x|%H:%M}<br>" +
+                             "Cambio: %{y:.2f}%<extra></extra>")
+        else:
+            hover_template = (f"<b>{symbol}</b><br>" +
+                             "Fecha: %{x|%d/%m/%Y}<br>" +
+                             "Cambio: %{y:.2f}%<extra></extra>")
+        
+        traces.append(dict(
+            x=x_values,
+            y=normalized,
+            mode='lines',
+            name=f"{symbol} {arrow} {final_change:+.1f}%",
+            line=dict(color=line_color, width=3),
+            fill='tozeroy',
+            fillcolor=fill_color,
+            hovertemplate=hover_template
+        ))
+    
+    fig.add_traces(line_traces(traces))
     
     # Configurar formato del eje X según período
     if period == "1d":
-        # Para 1D: mostrar rango completo 15:30-22:00 hora España
-        if reference_date:
-            # Rango en hora española
-            market_open = datetime.combine(reference_date, datetime.strptime("15:30", "%H:%M").time())
-            market_close = datetime.combine(reference_date, datetime.strptime("22:00", "%H:%M").time())
-            market_open = spain_tz.localize(market_open)
-            market_close = spain_tz.localize(market_close)
+        # Para 1D: mostrar la sesión completa en la hora que se muestra (según calendario),
+        # sin zona horaria como las x
+        session = market_calendar.session_in_tz(reference_date, tz) if reference_date else None
+        if session:
+            market_open, market_close = (t.replace(tzinfo=None) for t in session)
             
             xaxis_config = dict(
                 showgrid=True,
@@ -912,11 +1096,13 @@ def create_comparison_chart(data, symbols, period="1mo"):
         margin=dict(l=10, r=10, t=50, b=10),
         autosize=True
     )
+    # Las x se envían como milisegundos: el eje tiene que ser de fechas
+    fig.update_xaxes(type='date')
     
     # Mensaje si no hay datos
     if not has_data:
         fig.add_annotation(
-            text="No hay datos disponibles para este período.<br>El mercado NASDAQ opera de 15:30 a 22:00 (hora España).",
+            text=f"No hay datos disponibles para este período.<br>{market_hours_text(tz)}",
             xref="paper", yref="paper",
             x=0.5, y=0.5,
             showarrow=False,
@@ -938,7 +1124,7 @@ def create_market_cap_chart(data, symbols):
             caps.append(data[symbol]["market_cap"] / 1e12)  # En trillones
             names.append(symbol)
             # Usar el color único de cada acción
-            colors.append(MAGNIFICENT_SEVEN[symbol]['color'])
+            colors.append(symbol_info(symbol)['color'])
     
     fig = go.Figure(data=[
         go.Bar(
@@ -1037,6 +1223,398 @@ def check_alerts(data, alerts_config):
     return triggered_alerts
 
 
+def render_countdown(refresh_seconds):
+    """Cuenta atrás hasta la próxima actualización de los fragmentos en vivo"""
+    components.html(f"""
+    <div style="display: flex; align-items: center; justify-content: flex-start; font-family: 'Nunito', sans-serif; height: 38px;">
+        <span id="countdown" style="color: #B39DDB; font-weight: bold; font-size: 0.95rem; 
+              background: white; padding: 4px 12px; border-radius: 12px; border: 2px solid #ECEFF1;"></span>
+    </div>
+    <script>
+        var seconds = {refresh_seconds};
+        var countdownEl = document.getElementById('countdown');
+        var done = false;
+
+        function pad(n) {{ return (n < 10 ? '0' : '') + n; }}
+        function render() {{
+            var hours = Math.floor(seconds / 3600);
+            var mins = Math.floor((seconds % 3600) / 60);
+            var secs = seconds % 60;
+            countdownEl.textContent = hours > 0
+                ? hours + ':' + pad(mins) + ':' + pad(secs)
+                : mins + ':' + pad(secs);
+        }}
+        if (countdownEl) render();
+
+        var timer = setInterval(function() {{
+            if (done) return;
+
+            seconds--;
+            if (countdownEl) {{
+                render();
+                if (seconds <= 30) {{
+                    countdownEl.style.color = '#E53935';
+                    countdownEl.style.borderColor = '#FFCDD2';
+                }}
+            }}
+            // Los fragmentos se actualizan en el servidor; la cuenta atrás se reinicia con ellos
+            if (seconds <= 0) {{
+                done = true;
+                clearInterval(timer);
+                countdownEl.textContent = '⟳';
+            }}
+        }}, 1000);
+    </script>
+    """, height=38)
+
+
+def render_status(was_active, tz):
+    """Estado del mercado (en la zona horaria tz) y aviso de datos antiguos"""
+    # Al abrir o cerrar el mercado cambia el intervalo de actualización: rerun completo
+    # para volver a crear los fragmentos con el nuevo intervalo
+    if market_calendar.is_active() != was_active:
+        st.rerun()
+    st.caption(market_calendar.status_text(tz=tz))
+
+    # Aviso de datos antiguos: el proveedor falla o el circuit breaker está abierto
+    stale = get_poller().stale()
+    provider_stats = market_data.provider_stats()
+    breaker_open = provider_stats is not None and provider_stats["state"] != "cerrado"
+    if stale or breaker_open:
+        badge = "🟠 Mostrando los últimos datos disponibles"
+        if stale:
+            badge += (f" de las {datetime.fromtimestamp(min(stale.values()), tz):%H:%M}"
+                      f" ({', '.join(sorted(stale))})")
+        if breaker_open:
+            badge += f" · proveedor no disponible, se reintenta en {provider_stats['retry_in']:.0f} s"
+        st.warning(badge)
+
+
+def render_summary(selected_symbols, quote_symbols, tz):
+    """Tira de cotizaciones de la página de símbolos (horas en la zona horaria tz)"""
+    stock_data = get_stock_data(quote_symbols, market_data.QUOTES)
+
+    st.markdown("### 💹 Resumen")
+
+    # Métricas principales en una sola línea horizontal
+    items_html = []
+    stale_symbols = get_poller().stale(market_data.QUOTES)
+    for symbol in selected_symbols:
+        if stock_data[symbol]:
+            current = stock_data[symbol]["current_price"]
+            prev = stock_data[symbol]["prev_close"]
+            change = calculate_change(current, prev)
+            change_color = COLORS["up"] if change >= 0 else COLORS["down"]
+            arrow = "▲" if change >= 0 else "▼"
+            label = f"⏳ {symbol}" if symbol in stale_symbols else symbol
+
+            item = f'<div style="display:flex;flex-direction:column;align-items:center;background:white;padding:8px 10px;border-radius:10px;border:1px solid #ECEFF1;box-shadow:0 2px 8px rgba(0,0,0,0.04);min-width:80px;"><span style="font-weight:700;color:#37474F;font-size:0.85rem;">{label}</span><span style="font-family:monospace;font-weight:600;color:#37474F;font-size:0.9rem;">${current:.2f}</span><span style="font-family:monospace;font-weight:600;color:{change_color};font-size:0.8rem;">{arrow}{change:+.2f}%</span></div>'
+            items_html.append(item)
+        else:
+            # Símbolo sin datos (p. ej. retirado de cotización): se sigue mostrando sin
+            # afectar al resto y se reintenta pasado NEGATIVE_TTL con el mercado abierto
+            item = f'<div title="Sin datos del proveedor" style="display:flex;flex-direction:column;align-items:center;background:white;padding:8px 10px;border-radius:10px;border:1px solid #ECEFF1;min-width:80px;"><span style="font-weight:700;color:#37474F;font-size:0.85rem;">{symbol}</span><span style="color:#78909C;font-size:0.8rem;">Sin datos</span></div>'
+            items_html.append(item)
+
+    html_content = '<div style="display:flex;flex-wrap:wrap;gap:8px;justify-content:flex-start;">' + ''.join(items_html) + '</div>'
+    st.markdown(html_content, unsafe_allow_html=True)
+
+    # Latencia de la última carga de datos y versión del snapshot publicado
+    fetch_stats = market_data.FETCH_STATS
+    if fetch_stats["latency"] is not None:
+        poller = get_poller()
+        st.caption(f"⏱️ Última carga: {fetch_stats['latency']:.2f} s · "
+                   f"{fetch_stats['symbols']} símbolos · {fetch_stats['fetched_at'].astimezone(tz):%H:%M:%S} · "
+                   f"snapshot v{poller.snapshot().version}"
+                   + (" · 🔄 actualizando…" if poller.refreshing else ""))
+
+
+def render_prices(selected_symbols, quote_symbols):
+    """Gráfico de precios con su selector de período y tabla de datos detallados"""
+    stock_data = get_stock_data(quote_symbols, market_data.QUOTES)
+
+    # Selector de período para gráfico de precios
+    period_options = {
+        "1D": "1d", "5D": "5d", "1M": "1mo", "3M": "3mo", 
+        "6M": "6mo", "1A": "1y", "2A": "2y", "5A": "5y"
+    }
+
+    st.markdown("#### 📈 Evolución de Precios")
+    period_price = st.radio(
+        "Período",
+        options=list(period_options.keys()),
+        index=2,  # 1M por defecto
+        key="period_price",
+        horizontal=True,
+        label_visibility="collapsed"
+    )
+
+    # Intervalo de las barras en los períodos intradía (remuestreadas en local)
+    period_value = period_options[period_price]
+    interval_value = None
+    if period_value in market_data.DEFAULT_INTERVALS:
+        interval_options = ["1m", "5m", "15m", "30m", "1h"]
+        interval_value = st.radio(
+            "Intervalo",
+            options=interval_options,
+            index=interval_options.index(market_data.DEFAULT_INTERVALS[period_value]),
+            key=f"interval_price_{period_value}",
+            horizontal=True
+        )
+
+    # Obtener datos con el período seleccionado
+    max_points = chart_point_budget()
+    tz = get_display_tz()
+    version = get_poller().version(period_value, selected_symbols)
+    with st.spinner(""):
+        chart_data = get_stock_data(selected_symbols, period_value, interval_value)
+
+    # Gráfico de precios
+    st.plotly_chart(
+        cached_figure(
+            ("precios", tuple(selected_symbols), period_value, interval_value, max_points, tz.zone),
+            lambda: create_price_chart(chart_data, selected_symbols, "", period_value, max_points, tz),
+            version
+        ),
+        use_container_width=True
+    )
+
+    # Tabla de datos detallados
+    st.markdown("#### Datos Detallados")
+    table_data = []
+    for symbol in selected_symbols:
+        # Precio de la cotización y fundamentales de los datos del gráfico
+        if stock_data[symbol] and chart_data[symbol]:
+            d = chart_data[symbol]
+            quote = stock_data[symbol]
+            change = calculate_change(quote["current_price"], quote["prev_close"])
+            table_data.append({
+                "Símbolo": symbol,
+                "Precio": f"${quote['current_price']:.2f}",
+                "Cambio": change,
+                "Cap. Mercado": format_market_cap(d["market_cap"]),
+                "P/E": f"{d['pe_ratio']:.1f}" if d['pe_ratio'] else "-",
+                "52W Max": f"${d['52w_high']:.2f}",
+                "52W Min": f"${d['52w_low']:.2f}",
+            })
+
+    if table_data:
+        df = pd.DataFrame(table_data)
+
+        # Formatear la columna de cambio con colores
+        def color_change(val):
+            if isinstance(val, (int, float)):
+                color = COLORS["up"] if val >= 0 else COLORS["down"]
+                return f'color: {color}; font-weight: bold'
+            return ''
+
+        # Mostrar dataframe con estilo
+        styled_df = df.style.applymap(color_change, subset=['Cambio'])
+        styled_df = styled_df.format({'Cambio': '{:+.2f}%'})
+        st.dataframe(styled_df, use_container_width=True, hide_index=True)
+
+
+def render_triggered_alerts(quote_symbols):
+    """Alertas activadas con las últimas cotizaciones"""
+    stock_data = get_stock_data(quote_symbols, market_data.QUOTES)
+
+    # Inicializar alertas silenciadas (se borra al cerrar la app)
+    if "silenced_alerts" not in st.session_state:
+        st.session_state.silenced_alerts = set()
+
+    # Verificar alertas
+    all_triggered = check_alerts(stock_data, st.session_state.alerts)
+
+    # Filtrar alertas que no estén silenciadas
+    triggered = []
+    for a in all_triggered:
+        alert_id = f"{a['symbol']}_{a['type']}_{a.get('threshold', '')}"
+        if alert_id not in st.session_state.silenced_alerts:
+            triggered.append(a)
+
+    if triggered:
+        st.markdown("---")
+        st.markdown("### ⚠️ Alertas Activadas")
+
+        # Construir mensaje para la ventana emergente
+        alert_messages = []
+        for a in triggered:
+            if a["type"] == "upper":
+                alert_messages.append(f"▲ {a['symbol']}: Superó ${a['threshold']:.2f} (Actual: ${a['price']:.2f})")
+            elif a["type"] == "lower":
+                alert_messages.append(f"▼ {a['symbol']}: Bajó de ${a['threshold']:.2f} (Actual: ${a['price']:.2f})")
+            elif a["type"] == "change_up":
+                alert_messages.append(f"▲ {a['symbol']}: Subió {a['change']:+.2f}% (Umbral: +{a['threshold']:.1f}%)")
+            elif a["type"] == "change_down":
+                alert_messages.append(f"▼ {a['symbol']}: Bajó {a['change']:+.2f}% (Umbral: -{a['threshold']:.1f}%)")
+            else:
+                alert_messages.append(f"{a['symbol']}: Cambió {a['change']:+.2f}%")
+
+        # Construir HTML para cada alerta en el modal
+        alerts_html = ""
+        for a in triggered:
+            if a["type"] in ["upper", "change_up"]:
+                color = "#4CAF50"
+                bg = "#E8F5E9"
+                arrow = "▲"
+                if a["type"] == "upper":
+                    text = f'{a["symbol"]}: Superó ${a["threshold"]:.2f} (Actual: ${a["price"]:.2f})'
+                else:
+                    text = f'{a["symbol"]}: Subió {a["change"]:+.2f}% (Umbral: +{a["threshold"]:.1f}%)'
+            else:
+                color = "#E53935"
+                bg = "#FFEBEE"
+                arrow = "▼"
+                if a["type"] == "lower":
+                    text = f'{a["symbol"]}: Bajó de ${a["threshold"]:.2f} (Actual: ${a["price"]:.2f})'
+                else:
+                    text = f'{a["symbol"]}: Bajó {a["change"]:+.2f}% (Umbral: -{a["threshold"]:.1f}%)'
+
+            alerts_html += f'<div style="background:{bg};border-left:4px solid {color};padding:10px 14px;margin:8px 0;border-radius:0 8px 8px 0;"><span style="color:{color};font-weight:bold;">{arrow}</span> {text}</div>'
+
+        # Verificar si el sonido está habilitado
+        sound_enabled = st.session_state.get("sound_enabled", False)
+
+        # Reproducir sonido de alarma y mostrar modal en ventana emergente
+        components.html(f"""
+        <script>
+            (function() {{
+                var soundEnabled = {'true' if sound_enabled else 'false'};
+
+                // Sonido de alarma usando Audio API
+                function playBeep() {{
+                    if (!soundEnabled) return;
+                    try {{
+                        // Crear contexto de audio
+                        var audioCtx = new (window.AudioContext || window.webkitAudioContext)();
+
+                        // Función para un beep
+                        function beep(startTime, duration) {{
+                            var oscillator = audioCtx.createOscillator();
+                            var gainNode = audioCtx.createGain();
+                            oscillator.connect(gainNode);
+                            gainNode.connect(audioCtx.destination);
+                            oscillator.frequency.value = 880;
+                            oscillator.type = 'square';
+                            gainNode.gain.value = 0.3;
+                            oscillator.start(audioCtx.currentTime + startTime);
+                            oscillator.stop(audioCtx.currentTime + startTime + duration);
+                        }}
+
+                        // 5 beeps más fuertes
+                        beep(0, 0.2);
+                        beep(0.3, 0.2);
+                        beep(0.6, 0.2);
+                        beep(0.9, 0.2);
+                        beep(1.2, 0.2);
+                    }} catch(e) {{
+                        console.log('Audio error:', e);
+                    }}
+                }}
+
+                // Ejecutar sonido
+                playBeep();
+
+                // Crear modal en el documento padre
+                var parentDoc = window.parent.document;
+
+                // Eliminar modal anterior si existe
+                var oldModal = parentDoc.getElementById('nasdaq-alert-modal');
+                if (oldModal) oldModal.remove();
+
+                // Crear overlay
+                var overlay = parentDoc.createElement('div');
+                overlay.id = 'nasdaq-alert-modal';
+                overlay.style.cssText = 'position:fixed;top:0;left:0;width:100%;height:100%;background:rgba(0,0,0,0.5);display:flex;justify-content:center;align-items:center;z-index:999999;font-family:Nunito,sans-serif;';
+
+                // Crear contenido del modal
+                overlay.innerHTML = `
+                    <div style="background:linear-gradient(135deg,#FDF6F0 0%,#FFFFFF 100%);border-radius:20px;padding:24px;max-width:400px;width:90%;box-shadow:0 20px 60px rgba(0,0,0,0.3);animation:slideIn 0.3s ease;">
+                        <div style="display:flex;align-items:center;gap:10px;margin-bottom:16px;padding-bottom:12px;border-bottom:2px solid #ECEFF1;">
+                            <span style="font-size:1.8rem;">🚨</span>
+                            <span style="font-size:1.2rem;font-weight:700;color:#37474F;">Alertas Activadas</span>
+                        </div>
+                        <div style="max-height:300px;overflow-y:auto;">
+                            {alerts_html}
+                        </div>
+                        <button id="closeAlertBtn" style="width:100%;margin-top:16px;padding:12px;background:linear-gradient(135deg,#B39DDB 0%,#90CAF9 100%);color:white;border:none;border-radius:12px;font-size:1rem;font-weight:600;cursor:pointer;font-family:Nunito,sans-serif;">
+                            Aceptar
+                        </button>
+                    </div>
+                `;
+
+                // Añadir al documento padre
+                parentDoc.body.appendChild(overlay);
+
+                // Añadir evento para cerrar
+                parentDoc.getElementById('closeAlertBtn').onclick = function() {{
+                    overlay.remove();
+                }};
+
+                // Cerrar al hacer clic fuera
+                overlay.onclick = function(e) {{
+                    if (e.target === overlay) overlay.remove();
+                }};
+            }})();
+        </script>
+        """, height=0)
+
+        for alert in triggered:
+            if alert["type"] == "upper":
+                st.markdown(f"""
+                <div style="background: linear-gradient(90deg, #C8E6C9 0%, #E8F5E9 100%); border-left: 5px solid #4CAF50; padding: 12px 16px; border-radius: 0 12px 12px 0; margin: 8px 0;">
+                    <span style="color: #4CAF50; font-size: 1.2rem;">▲</span> <strong>{alert['symbol']}</strong> ha superado ${alert['threshold']:.2f} 
+                    (Actual: <span style="color: #4CAF50; font-weight: bold;">${alert['price']:.2f}</span>)
+                </div>
+                """, unsafe_allow_html=True)
+            elif alert["type"] == "lower":
+                st.markdown(f"""
+                <div style="background: linear-gradient(90deg, #FFCDD2 0%, #FFEBEE 100%); border-left: 5px solid #E53935; padding: 12px 16px; border-radius: 0 12px 12px 0; margin: 8px 0;">
+                    <span style="color: #E53935; font-size: 1.2rem;">▼</span> <strong>{alert['symbol']}</strong> ha bajado de ${alert['threshold']:.2f} 
+                    (Actual: <span style="color: #E53935; font-weight: bold;">${alert['price']:.2f}</span>)
+                </div>
+                """, unsafe_allow_html=True)
+            elif alert["type"] == "change_up":
+                st.markdown(f"""
+                <div style="background: linear-gradient(90deg, #C8E6C9 0%, #E8F5E9 100%); border-left: 5px solid #4CAF50; padding: 12px 16px; border-radius: 0 12px 12px 0; margin: 8px 0;">
+                    <span style="color: #4CAF50; font-size: 1.2rem;">▲</span> <strong>{alert['symbol']}</strong> ha subido 
+                    <span style="color: #4CAF50; font-weight: bold;">{alert['change']:+.2f}%</span>
+                    (Umbral: +{alert['threshold']:.1f}%)
+                </div>
+                """, unsafe_allow_html=True)
+            elif alert["type"] == "change_down":
+                st.markdown(f"""
+                <div style="background: linear-gradient(90deg, #FFCDD2 0%, #FFEBEE 100%); border-left: 5px solid #E53935; padding: 12px 16px; border-radius: 0 12px 12px 0; margin: 8px 0;">
+                    <span style="color: #E53935; font-size: 1.2rem;">▼</span> <strong>{alert['symbol']}</strong> ha bajado 
+                    <span style="color: #E53935; font-weight: bold;">{alert['change']:+.2f}%</span>
+                    (Umbral: -{alert['threshold']:.1f}%)
+                </div>
+                """, unsafe_allow_html=True)
+            else:
+                if alert['change'] >= 0:
+                    bg_style = "background: linear-gradient(90deg, #C8E6C9 0%, #E8F5E9 100%); border-left: 5px solid #4CAF50;"
+                    color = "#4CAF50"
+                    arrow = "▲"
+                else:
+                    bg_style = "background: linear-gradient(90deg, #FFCDD2 0%, #FFEBEE 100%); border-left: 5px solid #E53935;"
+                    color = "#E53935"
+                    arrow = "▼"
+                st.markdown(f"""
+                <div style="{bg_style} padding: 12px 16px; border-radius: 0 12px 12px 0; margin: 8px 0;">
+                    <span style="color: {color}; font-size: 1.2rem;">{arrow}</span> <strong>{alert['symbol']}</strong> ha cambiado 
+                    <span style="color: {color}; font-weight: bold;">{alert['change']:.2f}%</span>
+                    (Umbral: ±{alert['threshold']:.1f}%)
+                </div>
+                """, unsafe_allow_html=True)
+
+        # Botón para silenciar alertas activadas
+        if st.button("🗑️ Eliminar alertas activadas", key="silence_alerts", use_container_width=True):
+            for a in triggered:
+                alert_id = f"{a['symbol']}_{a['type']}_{a.get('threshold', '')}"
+                st.session_state.silenced_alerts.add(alert_id)
+            st.toast("Alertas eliminadas. Se reactivarán al recargar la página.")
+
+
 def main():
     # Header principal responsive
     st.markdown("""
@@ -1047,12 +1625,58 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    # Usar todas las acciones por defecto
-    selected_symbols = list(MAGNIFICENT_SEVEN.keys())
+    # Watchlist activa y página de símbolos que se muestran (resumen, gráficos y tabla)
+    watchlists = list(get_universe().watchlists)
+    col_list, col_page, col_tz, col_space = st.columns([1.5, 1, 1.2, 3])
+    with col_list:
+        watchlist = st.selectbox(
+            "📋 Lista",
+            options=watchlists,
+            index=watchlists.index(get_universe().default),
+            key="watchlist"
+        )
+    watchlist_symbols = get_universe().symbols(watchlist)
+    pages = max(1, -(-len(watchlist_symbols) // SUMMARY_PAGE_SIZE))
+    page = 1
+    if pages > 1:
+        with col_page:
+            page = st.number_input(f"Página (de {pages})", min_value=1, max_value=pages,
+                                   value=1, key=f"page_{watchlist}")
+    selected_symbols = watchlist_symbols[(page - 1) * SUMMARY_PAGE_SIZE:page * SUMMARY_PAGE_SIZE]
+    
+    # Zona horaria de las horas de los gráficos y del mercado (propia de cada usuario)
+    with col_tz:
+        timezones = list(display_time.DISPLAY_TIMEZONES)
+        st.selectbox(
+            "🕒 Zona horaria",
+            options=timezones,
+            index=timezones.index(market_calendar.DISPLAY_TZ.zone),
+            format_func=lambda zone: display_time.DISPLAY_TIMEZONES[zone],
+            key="display_tz"
+        )
     
-    # Obtener datos con período por defecto (1 mes) para métricas
+    # Añadir a la watchlist activa cualquier valor del índice local de símbolos
+    with col_space:
+        with st.expander("➕ Añadir símbolo a la lista"):
+            new_symbol = symbol_picker("Valor", [], key="watchlist_new_symbol")
+            if new_symbol and st.button(f"Añadir a {watchlist}", use_container_width=True):
+                listing = get_symbol_index().get(new_symbol)
+                if universe.add_to_watchlist(watchlist, new_symbol, listing[1] if listing else None):
+                    get_universe.clear()
+                    get_symbol_index.clear()
+                    st.rerun()
+                st.toast(f"{new_symbol} ya está en {watchlist}")
+    
+    # Cotizaciones de toda la lista y de los símbolos con alertas o posiciones, para las
+    # métricas, alertas y portfolio (sin históricos: estos solo se cargan, por páginas,
+    # al mostrar un gráfico)
+    # (y los elegidos en los buscadores de alertas y portfolio, aunque no estén en la lista)
+    picked = {st.session_state.get(key) for key in ("alert_symbol", "portfolio_symbol")} - {None}
+    extra_symbols = (set(load_alerts()) | set(load_portfolio()) | picked) - set(watchlist_symbols)
+    quote_symbols = watchlist_symbols + sorted(extra_symbols)
     with st.spinner("📡 Obteniendo datos del mercado..."):
-        stock_data = get_stock_data(selected_symbols, "1mo")
+        stock_data = get_stock_data(quote_symbols, market_data.QUOTES)
+
     
     # Inicializar estado de pestaña activa
     if "active_tab" not in st.session_state:
@@ -1134,141 +1758,34 @@ def main():
                 """, height=0)
             st.rerun()
     
+    # Las partes en vivo (estado, resumen, gráfico de precios y alertas activadas) son
+    # fragmentos: con la auto-actualización se vuelven a ejecutar en el servidor cada
+    # refresh_every segundos, sin recargar la página ni el resto del script
+    refresh_every = None
+    
     # Actualizar query params según el estado del checkbox
     if auto_refresh:
         st.query_params["autorefresh"] = "1"
+        # 5 minutos con el mercado abierto, hasta la apertura si está cerrado (los datos
+        # caducados se recargan en segundo plano en el sondeo)
+        refresh_every = market_calendar.seconds_until_refresh(AUTO_REFRESH_SECONDS)
         
         with col_countdown:
-            # Limpiar caché para obtener datos frescos en cada ciclo
-            st.cache_data.clear()
-            
-            # Cuenta atrás
-            components.html("""
-            <div style="display: flex; align-items: center; justify-content: flex-start; font-family: 'Nunito', sans-serif; height: 38px;">
-                <span id="countdown" style="color: #B39DDB; font-weight: bold; font-size: 0.95rem; 
-                      background: white; padding: 4px 12px; border-radius: 12px; border: 2px solid #ECEFF1;">5:00</span>
-            </div>
-            <script>
-                var seconds = 300;
-                var countdownEl = document.getElementById('countdown');
-                var reloading = false;
-                
-                var timer = setInterval(function() {
-                    if (reloading) return;
-                    
-                    seconds--;
-                    if (countdownEl) {
-                        var mins = Math.floor(seconds / 60);
-                        var secs = seconds % 60;
-                        countdownEl.textContent = mins + ':' + (secs < 10 ? '0' : '') + secs;
-                        if (seconds <= 30) {
-                            countdownEl.style.color = '#E53935';
-                            countdownEl.style.borderColor = '#FFCDD2';
-                        }
-                    }
-                    if (seconds <= 0) {
-                        reloading = true;
-                        clearInterval(timer);
-                        countdownEl.textContent = '⟳';
-                        
-                        // Forzar recarga de la página
-                        try {
-                            window.parent.location.reload(true);
-                        } catch(e) {
-                            window.top.location.reload(true);
-                        }
-                    }
-                }, 1000);
-            </script>
-            """, height=38)
+            st.fragment(render_countdown, run_every=refresh_every)(refresh_every)
     elif "autorefresh" in query_params:
         del st.query_params["autorefresh"]
     
+    st.fragment(render_status, run_every=refresh_every)(market_calendar.is_active(), get_display_tz())
+    
     st.markdown("---")
     
     # TAB 1: Dashboard
     if selected_tab == "📊 Dashboard":
-        st.markdown("### 💹 Resumen")
-        
-        # Métricas principales en una sola línea horizontal
-        items_html = []
-        for symbol in selected_symbols:
-            if stock_data[symbol]:
-                current = stock_data[symbol]["current_price"]
-                prev = stock_data[symbol]["prev_close"]
-                change = calculate_change(current, prev)
-                change_color = COLORS["up"] if change >= 0 else COLORS["down"]
-                arrow = "▲" if change >= 0 else "▼"
-                
-                item = f'<div style="display:flex;flex-direction:column;align-items:center;background:white;padding:8px 10px;border-radius:10px;border:1px solid #ECEFF1;box-shadow:0 2px 8px rgba(0,0,0,0.04);min-width:80px;"><span style="font-weight:700;color:#37474F;font-size:0.85rem;">{symbol}</span><span style="font-family:monospace;font-weight:600;color:#37474F;font-size:0.9rem;">${current:.2f}</span><span style="font-family:monospace;font-weight:600;color:{change_color};font-size:0.8rem;">{arrow}{change:+.2f}%</span></div>'
-                items_html.append(item)
-            else:
-                item = f'<div style="display:flex;flex-direction:column;align-items:center;background:white;padding:8px 10px;border-radius:10px;border:1px solid #ECEFF1;min-width:80px;"><span style="font-weight:700;color:#37474F;font-size:0.85rem;">{symbol}</span><span style="color:#78909C;">Error</span></div>'
-                items_html.append(item)
-        
-        html_content = '<div style="display:flex;flex-wrap:wrap;gap:8px;justify-content:flex-start;">' + ''.join(items_html) + '</div>'
-        st.markdown(html_content, unsafe_allow_html=True)
+        st.fragment(render_summary, run_every=refresh_every)(selected_symbols, quote_symbols, get_display_tz())
         
         st.markdown("---")
         
-        # Selector de período para gráfico de precios
-        period_options = {
-            "1D": "1d", "5D": "5d", "1M": "1mo", "3M": "3mo", 
-            "6M": "6mo", "1A": "1y", "2A": "2y", "5A": "5y"
-        }
-        
-        st.markdown("#### 📈 Evolución de Precios")
-        period_price = st.radio(
-            "Período",
-            options=list(period_options.keys()),
-            index=2,  # 1M por defecto
-            key="period_price",
-            horizontal=True,
-            label_visibility="collapsed"
-        )
-        
-        # Obtener datos con el período seleccionado
-        period_value = period_options[period_price]
-        with st.spinner(""):
-            chart_data = get_stock_data(selected_symbols, period_value)
-        
-        # Gráfico de precios
-        st.plotly_chart(
-            create_price_chart(chart_data, selected_symbols, "", period_value),
-            use_container_width=True
-        )
-        
-        # Tabla de datos detallados
-        st.markdown("#### Datos Detallados")
-        table_data = []
-        for symbol in selected_symbols:
-            if stock_data[symbol]:
-                d = stock_data[symbol]
-                change = calculate_change(d["current_price"], d["prev_close"])
-                table_data.append({
-                    "Símbolo": symbol,
-                    "Precio": f"${d['current_price']:.2f}",
-                    "Cambio": change,
-                    "Cap. Mercado": format_market_cap(d["market_cap"]),
-                    "P/E": f"{d['pe_ratio']:.1f}" if d['pe_ratio'] else "-",
-                    "52W Max": f"${d['52w_high']:.2f}",
-                    "52W Min": f"${d['52w_low']:.2f}",
-                })
-        
-        if table_data:
-            df = pd.DataFrame(table_data)
-            
-            # Formatear la columna de cambio con colores
-            def color_change(val):
-                if isinstance(val, (int, float)):
-                    color = COLORS["up"] if val >= 0 else COLORS["down"]
-                    return f'color: {color}; font-weight: bold'
-                return ''
-            
-            # Mostrar dataframe con estilo
-            styled_df = df.style.applymap(color_change, subset=['Cambio'])
-            styled_df = styled_df.format({'Cambio': '{:+.2f}%'})
-            st.dataframe(styled_df, use_container_width=True, hide_index=True)
+        st.fragment(render_prices, run_every=refresh_every)(selected_symbols, quote_symbols)
     
     # TAB 2: Comparativas
     if selected_tab == "📈 Comparativas":
@@ -1290,52 +1807,56 @@ def main():
         
         # Obtener datos con el período seleccionado
         period_comp_value = period_options_comp[period_comp]
+        max_points = chart_point_budget()
+        tz = get_display_tz()
+        poller = get_poller()
+        comp_version = poller.version(period_comp_value, selected_symbols)
+        matrix_version = poller.version(market_data.history_view(period_comp_value), watchlist_symbols)
         with st.spinner(""):
             comp_data = get_stock_data(selected_symbols, period_comp_value)
+            # Matriz de toda la lista para el ranking; el gráfico solo dibuja la página
+            matrix = get_price_matrix(watchlist_symbols, period_comp_value)
         
         # Gráfico de comparativa de rendimiento
         st.plotly_chart(
-            create_comparison_chart(comp_data, selected_symbols, period_comp_value),
+            cached_figure(
+                ("comparativa", tuple(selected_symbols), period_comp_value, max_points, tz.zone),
+                lambda: create_comparison_chart(matrix, period_comp_value, max_points, tz, selected_symbols),
+                matrix_version
+            ),
             use_container_width=True
         )
         
         # Gráfico de capitalización de mercado
         st.plotly_chart(
-            create_market_cap_chart(comp_data, selected_symbols),
+            cached_figure(
+                ("capitalizacion", tuple(selected_symbols), period_comp_value),
+                lambda: create_market_cap_chart(comp_data, selected_symbols),
+                comp_version
+            ),
             use_container_width=True
         )
         
         # Ranking de rendimiento
         st.markdown("### 🏆 Ranking de Rendimiento")
         
-        performance_data = []
-        for symbol in selected_symbols:
-            if comp_data[symbol] and len(comp_data[symbol]["history"]) > 0:
-                hist = comp_data[symbol]["history"]
-                first_price = hist['Close'].iloc[0]
-                last_price = hist['Close'].iloc[-1]
-                change = ((last_price - first_price) / first_price) * 100
-                performance_data.append({
-                    "symbol": symbol,
-                    "name": MAGNIFICENT_SEVEN[symbol]['name'],
-                    "change": change
-                })
-        
-        performance_data.sort(key=lambda x: x["change"], reverse=True)
-        
-        for idx, item in enumerate(performance_data):
+        # Cambios del período ya calculados y ordenados en la matriz de precios; todas
+        # las posiciones en un solo bloque HTML
+        ranking_html = []
+        for idx, (symbol, change) in enumerate(matrix.ranking(RANKING_SIZE)):
             medal = ["🥇", "🥈", "🥉"][idx] if idx < 3 else f"#{idx+1}"
-            is_positive = item["change"] >= 0
+            is_positive = change >= 0
             color = COLORS["up"] if is_positive else COLORS["down"]
-            st.markdown(f"""
+            ranking_html.append(f"""
             <div class="{'alert-up' if is_positive else 'alert-down'}">
                 <span style="font-size: 1.3rem; margin-right: 8px;">{medal}</span>
-                <strong style="color: #37474F;">{item['symbol']} - {item['name']}</strong>
+                <strong style="color: #37474F;">{symbol} - {symbol_info(symbol)['name']}</strong>
                 <span style="float: right; color: {color}; font-weight: 700; font-family: 'IBM Plex Mono', monospace;">
-                    {item['change']:+.2f}%
+                    {change:+.2f}%
                 </span>
             </div>
-            """, unsafe_allow_html=True)
+            """)
+        st.markdown("".join(ranking_html), unsafe_allow_html=True)
     
     # TAB 3: Alertas
     if selected_tab == "🔔 Alertas":
@@ -1351,13 +1872,10 @@ def main():
         with col1:
             st.markdown("#### ➕ Configurar Nueva Alerta")
             
-            alert_symbol = st.selectbox(
-                "Selecciona la acción",
-                options=selected_symbols,
-                format_func=lambda x: f"{x} - {MAGNIFICENT_SEVEN[x]['name']}"
-            )
+            alert_symbol = symbol_picker("Selecciona la acción", watchlist_symbols, key="alert_symbol")
             
-            current_price = stock_data[alert_symbol]["current_price"] if stock_data[alert_symbol] else 0
+            alert_quote = picked_quote(stock_data, alert_symbol)
+            current_price = alert_quote["current_price"] if alert_quote else 0
             st.info(f"💵 Precio actual: **${current_price:.2f}**")
             
             alert_type = st.radio(
@@ -1398,7 +1916,7 @@ def main():
                 )
                 alert_key = "change_down"
             
-            if st.button("➕ Añadir Alerta", use_container_width=True):
+            if st.button("➕ Añadir Alerta", use_container_width=True, disabled=alert_symbol is None):
                 if alert_symbol not in st.session_state.alerts:
                     st.session_state.alerts[alert_symbol] = {}
                 st.session_state.alerts[alert_symbol][alert_key] = threshold
@@ -1428,201 +1946,7 @@ def main():
                             save_alerts(st.session_state.alerts)  # Guardar cambios
                             st.toast(f"Alertas de {symbol} eliminadas")
                 
-                # Inicializar alertas silenciadas (se borra al cerrar la app)
-                if "silenced_alerts" not in st.session_state:
-                    st.session_state.silenced_alerts = set()
-                
-                # Verificar alertas
-                all_triggered = check_alerts(stock_data, st.session_state.alerts)
-                
-                # Filtrar alertas que no estén silenciadas
-                triggered = []
-                for a in all_triggered:
-                    alert_id = f"{a['symbol']}_{a['type']}_{a.get('threshold', '')}"
-                    if alert_id not in st.session_state.silenced_alerts:
-                        triggered.append(a)
-                
-                if triggered:
-                    st.markdown("---")
-                    st.markdown("### ⚠️ Alertas Activadas")
-                    
-                    # Construir mensaje para la ventana emergente
-                    alert_messages = []
-                    for a in triggered:
-                        if a["type"] == "upper":
-                            alert_messages.append(f"▲ {a['symbol']}: Superó ${a['threshold']:.2f} (Actual: ${a['price']:.2f})")
-                        elif a["type"] == "lower":
-                            alert_messages.append(f"▼ {a['symbol']}: Bajó de ${a['threshold']:.2f} (Actual: ${a['price']:.2f})")
-                        elif a["type"] == "change_up":
-                            alert_messages.append(f"▲ {a['symbol']}: Subió {a['change']:+.2f}% (Umbral: +{a['threshold']:.1f}%)")
-                        elif a["type"] == "change_down":
-                            alert_messages.append(f"▼ {a['symbol']}: Bajó {a['change']:+.2f}% (Umbral: -{a['threshold']:.1f}%)")
-                        else:
-                            alert_messages.append(f"{a['symbol']}: Cambió {a['change']:+.2f}%")
-                    
-                    # Construir HTML para cada alerta en el modal
-                    alerts_html = ""
-                    for a in triggered:
-                        if a["type"] in ["upper", "change_up"]:
-                            color = "#4CAF50"
-                            bg = "#E8F5E9"
-                            arrow = "▲"
-                            if a["type"] == "upper":
-                                text = f'{a["symbol"]}: Superó ${a["threshold"]:.2f} (Actual: ${a["price"]:.2f})'
-                            else:
-                                text = f'{a["symbol"]}: Subió {a["change"]:+.2f}% (Umbral: +{a["threshold"]:.1f}%)'
-                        else:
-                            color = "#E53935"
-                            bg = "#FFEBEE"
-                            arrow = "▼"
-                            if a["type"] == "lower":
-                                text = f'{a["symbol"]}: Bajó de ${a["threshold"]:.2f} (Actual: ${a["price"]:.2f})'
-                            else:
-                                text = f'{a["symbol"]}: Bajó {a["change"]:+.2f}% (Umbral: -{a["threshold"]:.1f}%)'
-                        
-                        alerts_html += f'<div style="background:{bg};border-left:4px solid {color};padding:10px 14px;margin:8px 0;border-radius:0 8px 8px 0;"><span style="color:{color};font-weight:bold;">{arrow}</span> {text}</div>'
-                    
-                    # Verificar si el sonido está habilitado
-                    sound_enabled = st.session_state.get("sound_enabled", False)
-                    
-                    # Reproducir sonido de alarma y mostrar modal en ventana emergente
-                    components.html(f"""
-                    <script>
-                        (function() {{
-                            var soundEnabled = {'true' if sound_enabled else 'false'};
-                            
-                            // Sonido de alarma usando Audio API
-                            function playBeep() {{
-                                if (!soundEnabled) return;
-                                try {{
-                                    // Crear contexto de audio
-                                    var audioCtx = new (window.AudioContext || window.webkitAudioContext)();
-                                    
-                                    // Función para un beep
-                                    function beep(startTime, duration) {{
-                                        var oscillator = audioCtx.createOscillator();
-                                        var gainNode = audioCtx.createGain();
-                                        oscillator.connect(gainNode);
-                                        gainNode.connect(audioCtx.destination);
-                                        oscillator.frequency.value = 880;
-                                        oscillator.type = 'square';
-                                        gainNode.gain.value = 0.3;
-                                        oscillator.start(audioCtx.currentTime + startTime);
-                                        oscillator.stop(audioCtx.currentTime + startTime + duration);
-                                    }}
-                                    
-                                    // 5 beeps más fuertes
-                                    beep(0, 0.2);
-                                    beep(0.3, 0.2);
-                                    beep(0.6, 0.2);
-                                    beep(0.9, 0.2);
-                                    beep(1.2, 0.2);
-                                }} catch(e) {{
-                                    console.log('Audio error:', e);
-                                }}
-                            }}
-                            
-                            // Ejecutar sonido
-                            playBeep();
-                            
-                            // Crear modal en el documento padre
-                            var parentDoc = window.parent.document;
-                            
-                            // Eliminar modal anterior si existe
-                            var oldModal = parentDoc.getElementById('nasdaq-alert-modal');
-                            if (oldModal) oldModal.remove();
-                            
-                            // Crear overlay
-                            var overlay = parentDoc.createElement('div');
-                            overlay.id = 'nasdaq-alert-modal';
-                            overlay.style.cssText = 'position:fixed;top:0;left:0;width:100%;height:100%;background:rgba(0,0,0,0.5);display:flex;justify-content:center;align-items:center;z-index:999999;font-family:Nunito,sans-serif;';
-                            
-                            // Crear contenido del modal
-                            overlay.innerHTML = `
-                                <div style="background:linear-gradient(135deg,#FDF6F0 0%,#FFFFFF 100%);border-radius:20px;padding:24px;max-width:400px;width:90%;box-shadow:0 20px 60px rgba(0,0,0,0.3);animation:slideIn 0.3s ease;">
-                                    <div style="display:flex;align-items:center;gap:10px;margin-bottom:16px;padding-bottom:12px;border-bottom:2px solid #ECEFF1;">
-                                        <span style="font-size:1.8rem;">🚨</span>
-                                        <span style="font-size:1.2rem;font-weight:700;color:#37474F;">Alertas Activadas</span>
-                                    </div>
-                                    <div style="max-height:300px;overflow-y:auto;">
-                                        {alerts_html}
-                                    </div>
-                                    <button id="closeAlertBtn" style="width:100%;margin-top:16px;padding:12px;background:linear-gradient(135deg,#B39DDB 0%,#90CAF9 100%);color:white;border:none;border-radius:12px;font-size:1rem;font-weight:600;cursor:pointer;font-family:Nunito,sans-serif;">
-                                        Aceptar
-                                    </button>
-                                </div>
-                            `;
-                            
-                            // Añadir al documento padre
-                            parentDoc.body.appendChild(overlay);
-                            
-                            // Añadir evento para cerrar
-                            parentDoc.getElementById('closeAlertBtn').onclick = function() {{
-                                overlay.remove();
-                            }};
-                            
-                            // Cerrar al hacer clic fuera
-                            overlay.onclick = function(e) {{
-                                if (e.target === overlay) overlay.remove();
-                            }};
-                        }})();
-                    </script>
-                    """, height=0)
-                    
-                    for alert in triggered:
-                        if alert["type"] == "upper":
-                            st.markdown(f"""
-                            <div style="background: linear-gradient(90deg, #C8E6C9 0%, #E8F5E9 100%); border-left: 5px solid #4CAF50; padding: 12px 16px; border-radius: 0 12px 12px 0; margin: 8px 0;">
-                                <span style="color: #4CAF50; font-size: 1.2rem;">▲</span> <strong>{alert['symbol']}</strong> ha superado ${alert['threshold']:.2f} 
-                                (Actual: <span style="color: #4CAF50; font-weight: bold;">${alert['price']:.2f}</span>)
-                            </div>
-                            """, unsafe_allow_html=True)
-                        elif alert["type"] == "lower":
-                            st.markdown(f"""
-                            <div style="background: linear-gradient(90deg, #FFCDD2 0%, #FFEBEE 100%); border-left: 5px solid #E53935; padding: 12px 16px; border-radius: 0 12px 12px 0; margin: 8px 0;">
-                                <span style="color: #E53935; font-size: 1.2rem;">▼</span> <strong>{alert['symbol']}</strong> ha bajado de ${alert['threshold']:.2f} 
-                                (Actual: <span style="color: #E53935; font-weight: bold;">${alert['price']:.2f}</span>)
-                            </div>
-                            """, unsafe_allow_html=True)
-                        elif alert["type"] == "change_up":
-                            st.markdown(f"""
-                            <div style="background: linear-gradient(90deg, #C8E6C9 0%, #E8F5E9 100%); border-left: 5px solid #4CAF50; padding: 12px 16px; border-radius: 0 12px 12px 0; margin: 8px 0;">
-                                <span style="color: #4CAF50; font-size: 1.2rem;">▲</span> <strong>{alert['symbol']}</strong> ha subido 
-                                <span style="color: #4CAF50; font-weight: bold;">{alert['change']:+.2f}%</span>
-                                (Umbral: +{alert['threshold']:.1f}%)
-                            </div>
-                            """, unsafe_allow_html=True)
-                        elif alert["type"] == "change_down":
-                            st.markdown(f"""
-                            <div style="background: linear-gradient(90deg, #FFCDD2 0%, #FFEBEE 100%); border-left: 5px solid #E53935; padding: 12px 16px; border-radius: 0 12px 12px 0; margin: 8px 0;">
-                                <span style="color: #E53935; font-size: 1.2rem;">▼</span> <strong>{alert['symbol']}</strong> ha bajado 
-                                <span style="color: #E53935; font-weight: bold;">{alert['change']:+.2f}%</span>
-                                (Umbral: -{alert['threshold']:.1f}%)
-                            </div>
-                            """, unsafe_allow_html=True)
-                        else:
-                            if alert['change'] >= 0:
-                                bg_style = "background: linear-gradient(90deg, #C8E6C9 0%, #E8F5E9 100%); border-left: 5px solid #4CAF50;"
-                                color = "#4CAF50"
-                                arrow = "▲"
-                            else:
-                                bg_style = "background: linear-gradient(90deg, #FFCDD2 0%, #FFEBEE 100%); border-left: 5px solid #E53935;"
-                                color = "#E53935"
-                                arrow = "▼"
-                            st.markdown(f"""
-                            <div style="{bg_style} padding: 12px 16px; border-radius: 0 12px 12px 0; margin: 8px 0;">
-                                <span style="color: {color}; font-size: 1.2rem;">{arrow}</span> <strong>{alert['symbol']}</strong> ha cambiado 
-                                <span style="color: {color}; font-weight: bold;">{alert['change']:.2f}%</span>
-                                (Umbral: ±{alert['threshold']:.1f}%)
-                            </div>
-                            """, unsafe_allow_html=True)
-                    
-                    # Botón para silenciar alertas activadas
-                    if st.button("🗑️ Eliminar alertas activadas", key="silence_alerts", use_container_width=True):
-                        for a in triggered:
-                            alert_id = f"{a['symbol']}_{a['type']}_{a.get('threshold', '')}"
-                            st.session_state.silenced_alerts.add(alert_id)
-                        st.toast("Alertas eliminadas. Se reactivarán al recargar la página.")
+                st.fragment(render_triggered_alerts, run_every=refresh_every)(quote_symbols)
             else:
                 st.info("No hay alertas configuradas. Añade una alerta en el panel izquierdo.")
         
@@ -1672,18 +1996,13 @@ def main():
         with col1:
             st.markdown("#### Añadir Posición")
             
-            port_symbol = st.selectbox(
-                "Acción",
-                options=list(MAGNIFICENT_SEVEN.keys()),
-                format_func=lambda x: f"{x} - {MAGNIFICENT_SEVEN[x]['name']}",
-                key="portfolio_symbol"
-            )
+            port_symbol = symbol_picker("Acción", watchlist_symbols, key="portfolio_symbol")
             
             shares = st.number_input("Número de acciones", min_value=0.0, value=1.0, step=0.1)
             buy_price = st.number_input("Precio de compra ($)", min_value=0.0, value=100.0, step=1.0)
             buy_date = st.date_input("Fecha de compra", value=datetime.now())
             
-            if st.button("Guardar Posición", use_container_width=True):
+            if st.button("Guardar Posición", use_container_width=True, disabled=port_symbol is None):
                 if port_symbol not in portfolio:
                     portfolio[port_symbol] = []
                 
@@ -1705,7 +2024,7 @@ def main():
                 portfolio_details = []
                 
                 for symbol, positions in portfolio.items():
-                    if symbol in MAGNIFICENT_SEVEN:
+                    if symbol in stock_data:
                         current_price = stock_data.get(symbol, {})
                         if current_price and current_price.get("current_price"):
                             curr_price = current_price["current_price"]
@@ -1771,10 +2090,7 @@ def main():
                     pie_colors = []
                     for d in portfolio_details:
                         symbol = d["Símbolo"]
-                        if symbol in MAGNIFICENT_SEVEN:
-                            pie_colors.append(MAGNIFICENT_SEVEN[symbol]['color'])
-                        else:
-                            pie_colors.append('#B39DDB')  # Color por defecto
+                        pie_colors.append(symbol_info(symbol)['color'])
                     
                     fig = go.Figure(data=[go.Pie(
                         labels=[d["Símbolo"] for d in portfolio_details],
@@ -1836,6 +2152,39 @@ def main():
                     st.success("Portfolio importado correctamente")
                 except Exception as e:
                     st.error(f"Error al importar: {e}")
+    
+    # Diagnóstico de la capa de datos (aciertos de caché y peticiones agrupadas)
+    st.markdown("---")
+    with st.expander("🛠️ Diagnóstico de datos", expanded=False):
+        poller = get_poller()
+        stats = {**market_data.cache_stats(), "Figuras": get_figure_cache().stats(),
+                 "Primeras cargas": poller.stats()}
+        diag_df = pd.DataFrame([
+            {
+                "Capa": name,
+                "Aciertos": values.get("hits"),
+                "Fallos": values.get("misses"),
+                "% aciertos": (round(100 * values["hits"] / (values["hits"] + values["misses"]), 1)
+                               if values.get("hits", 0) + values.get("misses", 0) else None),
+                "Cargas fallidas": values.get("failures"),
+                "Ejecutadas": values["executed"],
+                "Agrupadas": values["coalesced"]
+            }
+            for name, values in stats.items()
+        ])
+        st.dataframe(diag_df, use_container_width=True, hide_index=True)
+        provider_stats = market_data.provider_stats()
+        if provider_stats is not None:
+            st.caption(f"Circuit breaker: {provider_stats['state']} "
+                       f"(abierto {provider_stats['trips']} veces, {provider_stats['rejected']} peticiones rechazadas) · "
+                       f"{provider_stats['calls']} peticiones · {provider_stats['retries']} reintentos · "
+                       f"{provider_stats['throttled']} esperas por límite de peticiones")
+        st.caption(f"Memoria de la caché de históricos: {market_data.cache_memory() / 1e6:.2f} MB")
+        failed = poller.failed_symbols()
+        st.caption(f"Proveedor: {market_data.get_provider().name} · "
+                   f"Snapshot v{poller.snapshot().version} · "
+                   f"vistas en sondeo: {', '.join(f'{v} ({n})' for v, n in poller.subscriptions()) or '-'}"
+                   + (f" · sin datos (se reintentan): {', '.join(failed)}" if failed else ""))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,93 @@
+"""
+Benchmark del acceso a datos por rerun
+Compara el coste de obtener los datos de acciones en cada rerun con copias
+serializadas (como hacía st.cache_data) y con el snapshot compartido del sondeo.
+Usa un proveedor sintético, así que no necesita red.
+
+Uso:
+    python benchmark.py [reruns]
+"""
+
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from providers import MarketDataProvider
+
+SYMBOLS = ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "META", "TSLA"]
+PERIODS = ["1d", "5d", "1mo", "1y", "5y"]
+
+
+class SyntheticProvider(MarketDataProvider):
+    """Proveedor con paseos aleatorios deterministas (sin red)"""
+
+    name = "sintético"
+
+    def history(self, symbols, period=None, interval="1d", start=None):
+        end = pd.Timestamp.now(tz="America/New_York").normalize()
+        if interval == "1d":
+            index = pd.bdate_range(end=end.tz_localize(None), periods=1260).tz_localize("America/New_York")
+        else:
+            days = pd.bdate_range(end=end.tz_localize(None), periods=5)
+            index = pd.DatetimeIndex(np.concatenate([
+                pd.date_range(day + pd.Timedelta(hours=9, minutes=30), periods=390, freq="1min").to_numpy()
+                for day in days
+            ])).tz_localize("America/New_York")
+        if start is not None:
+            index = index[index >= pd.Timestamp(start)]
+        histories = {}
+        for i, symbol in enumerate(symbols):
+            close = 100 + np.cumsum(np.random.default_rng(i).normal(0, 1, len(index)))
+            histories[symbol] = pd.DataFrame({
+                "Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                "Volume": np.full(len(index), 1e6), "Dividends": 0.0, "Stock Splits": 0.0
+            }, index=index)
+        return histories
+
+    def info(self, symbol):
+        return {"previousClose": 100.0, "marketCap": 2e12, "volume": 1e6, "trailingPE": 30.0,
+                "fiftyTwoWeekHigh": 150.0, "fiftyTwoWeekLow": 80.0}
+
+
+def plain(data):
+    """Copia de los datos como diccionarios normales (para poder serializarlos)"""
+    return {symbol: dict(value) if value is not None else None for symbol, value in data.items()}
+
+
+def time_reruns(read, reruns):
+    """Milisegundos por rerun de read()"""
+    start = time.perf_counter()
+    for _ in range(reruns):
+        read()
+    return (time.perf_counter() - start) / reruns * 1000
+
+
+def main(reruns=200):
+    os.environ["NASDAQ_STORE_FILE"] = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+    import market_data
+    from poller import MarketDataPoller
+
+    market_data.set_provider(SyntheticProvider())
+    poller = MarketDataPoller(SYMBOLS, market_data.load_stock_data, interval=lambda: 3600)
+
+    print(f"{'Período':<8} {'Filas':>6} {'Antes (ms)':>11} {'Ahora (ms)':>11}")
+    for period in PERIODS:
+        monthly, data = plain(poller.get("1mo")), plain(poller.get(period))
+        rows = len(data[SYMBOLS[0]]["history"])
+
+        # Antes: st.cache_data devolvía una copia serializada de cada período en cada
+        # rerun (el de 1 mes de las métricas y el del gráfico)
+        before = time_reruns(lambda: (pickle.loads(pickle.dumps(monthly)),
+                                      pickle.loads(pickle.dumps(data))), reruns)
+        # Ahora: referencias al snapshot compartido, sin copias
+        after = time_reruns(lambda: (poller.get("1mo"), poller.get(period)), reruns)
+        print(f"{period:<8} {rows:>6} {before:>11.3f} {after:>11.4f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
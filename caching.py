@@ -0,0 +1,201 @@
+"""
+Cachés en memoria compartidas por todas las sesiones de la aplicación
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheEntry:
+    """Valor cacheado junto con su ventana de validez y la hora en que se obtuvo
+
+    Las entradas con failed=True guardan la excepción de una carga fallida (caché negativa).
+    """
+
+    __slots__ = ("value", "epoch", "fetched_at", "failed")
+
+    def __init__(self, value, epoch, fetched_at, failed=False):
+        self.value = value
+        self.epoch = epoch
+        self.fetched_at = fetched_at
+        self.failed = failed
+
+
+class _Call:
+    """Carga en curso de una clave: los que esperan se bloquean en event"""
+
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlight:
+    """Agrupa las peticiones concurrentes de una misma clave en una sola ejecución
+
+    Mientras una clave se está cargando, el resto de peticiones de esa clave esperan
+    y reciben el mismo resultado (o la misma excepción) en lugar de repetir la carga.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Ejecutar fn() para key, o esperar al resultado si ya hay una ejecución en curso"""
+        return self.do_many([key], lambda keys: {key: fn()})[key]
+
+    def do_many(self, keys, fn):
+        """Versión por lotes de do()
+
+        fn(claves) se llama solo con las claves que nadie está cargando y debe devolver
+        {clave: valor}; las claves que ya estaban en curso se esperan.
+        """
+        own, others = [], []
+        with self._lock:
+            for key in keys:
+                call = self._calls.get(key)
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    own.append((key, call))
+                else:
+                    others.append((key, call))
+            self.executed += len(own)
+            self.coalesced += len(others)
+
+        results = {}
+        if own:
+            try:
+                values = fn([key for key, _ in own])
+                for key, call in own:
+                    call.value = results[key] = values.get(key)
+            except Exception as e:
+                for _, call in own:
+                    call.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key, _ in own:
+                        del self._calls[key]
+                for _, call in own:
+                    call.event.set()
+
+        for key, call in others:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            results[key] = call.value
+        return results
+
+    def stats(self):
+        """Contadores: ejecuciones reales y peticiones agrupadas en otra en curso"""
+        return {"executed": self.executed, "coalesced": self.coalesced}
+
+
+class EpochCache:
+    """Caché por clave cuyas entradas valen mientras no cambie su ventana de validez (epoch)
+
+    Los fallos se cachean aparte con su propia ventana (retry_epoch), normalmente más
+    corta, para no repetir en cada lectura una carga que acaba de fallar; sin
+    retry_epoch no se cachean. Los fallos concurrentes de una misma clave comparten una
+    sola carga (SingleFlight). Al superar max_entries se descartan las entradas usadas
+    hace más tiempo.
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    def _lookup(self, key, epoch, retry_epoch):
+        """Entrada vigente de una clave, o None (llamar con el lock tomado)"""
+        entry = self._entries.get(key)
+        if entry is None or entry.epoch != (retry_epoch if entry.failed else epoch):
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def get(self, key, loader, epoch, retry_epoch=None):
+        """Devolver el valor de key, cargándolo con loader() si no existe o ha caducado
+
+        Si la carga falla se lanza la excepción, que se recuerda hasta que cambie retry_epoch.
+        """
+        def load(keys):
+            try:
+                return {key: loader()}
+            except Exception as e:
+                return {key: e}
+
+        value = self.get_many([key], load, epoch, retry_epoch)[key]
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def get_many(self, keys, loader, epoch, retry_epoch=None):
+        """Versión por lotes de get(): una sola llamada a loader(claves) para las que faltan
+
+        loader devuelve {clave: valor}; un valor que es una excepción marca esa clave como
+        fallida. Devuelve {clave: valor o excepción}, así que un fallo no afecta al resto.
+        """
+        results, missing = {}, []
+        with self._lock:
+            for key in keys:
+                entry = self._lookup(key, epoch, retry_epoch)
+                if entry is None:
+                    missing.append(key)
+                else:
+                    results[key] = entry.value
+
+        if missing:
+            loaded = self._flight.do_many(
+                [(key, epoch) for key in missing],
+                lambda flights: self._load([key for key, _ in flights], loader, epoch, retry_epoch)
+            )
+            for key in missing:
+                results[key] = loaded[(key, epoch)]
+        return {key: results[key] for key in keys}
+
+    def _load(self, keys, loader, epoch, retry_epoch):
+        """Cargar varias claves y guardarlas en la caché (los fallos, solo con retry_epoch)"""
+        values = loader(keys)
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                value = values.get(key)
+                failed = isinstance(value, Exception)
+                if failed:
+                    self.failures += 1
+                    if retry_epoch is None:
+                        continue
+                self._entries[key] = CacheEntry(value, retry_epoch if failed else epoch, now, failed)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return {(key, epoch): values.get(key) for key in keys}
+
+    def stats(self):
+        """Contadores de aciertos, fallos de caché, cargas fallidas y cargas agrupadas"""
+        return {"hits": self.hits, "misses": self.misses, "failures": self.failures,
+                **self._flight.stats()}
+
+    def nbytes(self, sizeof):
+        """Memoria ocupada por los valores cacheados, medida con sizeof(valor)"""
+        with self._lock:
+            values = [entry.value for entry in self._entries.values() if not entry.failed]
+        return sum(sizeof(value) for value in values)
+
+    def clear(self):
+        """Vaciar la caché"""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,113 @@
+"""
+Representación compacta de los datos cacheados
+Históricos como arrays (marcas de tiempo int64, precios float32) y fundamentales
+reducidos a los campos que usa la aplicación
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_store import EXCHANGE_TZ
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close"]
+
+
+class CompactHistory:
+    """Histórico OHLCV compacto: marcas de tiempo en ns (UTC), precios float32 y volumen int64
+
+    Solo guarda las columnas que se muestran (sin dividendos ni splits) y se convierte
+    a DataFrame con to_frame() al leerlo.
+    """
+
+    __slots__ = ("ts", "open", "high", "low", "close", "volume", "tz", "index_name")
+
+    def __init__(self, ts, open, high, low, close, volume, tz=EXCHANGE_TZ, index_name=None):
+        self.ts = ts
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.tz = tz
+        self.index_name = index_name
+
+    @classmethod
+    def from_frame(cls, hist):
+        """Construir a partir de un DataFrame con el formato de Ticker.history"""
+        if len(hist) == 0:
+            empty = np.empty(0, dtype="float32")
+            return cls(np.empty(0, dtype="int64"), empty, empty, empty, empty, np.empty(0, dtype="int64"))
+        index = hist.index
+        if index.tz is None:
+            index = index.tz_localize(EXCHANGE_TZ)
+        prices = [hist[c].to_numpy(dtype="float32", na_value=np.nan) for c in PRICE_COLUMNS]
+        volume = np.nan_to_num(hist["Volume"].to_numpy(dtype="float64", na_value=np.nan)).astype("int64")
+        return cls(index.tz_convert("UTC").asi8.copy(), *prices, volume, str(index.tz), index.name)
+
+    def __len__(self):
+        return len(self.ts)
+
+    @property
+    def nbytes(self):
+        """Memoria ocupada por los arrays"""
+        return sum(getattr(self, name).nbytes for name in ("ts", "open", "high", "low", "close", "volume"))
+
+    def to_frame(self):
+        """DataFrame con las columnas de Ticker.history que se guardan"""
+        index = pd.DatetimeIndex(pd.to_datetime(self.ts, unit="ns", utc=True)).tz_convert(self.tz)
+        index.name = self.index_name
+        return pd.DataFrame(
+            {"Open": self.open, "High": self.high, "Low": self.low, "Close": self.close,
+             "Volume": self.volume},
+            index=index,
+            copy=False
+        )
+
+
+class Fundamentals:
+    """Datos fundamentales de un símbolo (los campos de ticker.info que usa la aplicación)"""
+
+    __slots__ = ("previous_close", "market_cap", "volume", "pe_ratio", "high_52w", "low_52w")
+
+    def __init__(self, previous_close=None, market_cap=0, volume=0, pe_ratio=0, high_52w=0, low_52w=0):
+        self.previous_close = previous_close
+        self.market_cap = market_cap
+        self.volume = volume
+        self.pe_ratio = pe_ratio
+        self.high_52w = high_52w
+        self.low_52w = low_52w
+
+    @classmethod
+    def from_info(cls, info):
+        """Extraer los campos de un diccionario ticker.info"""
+        return cls(
+            previous_close=info.get('previousClose'),
+            market_cap=info.get('marketCap', 0),
+            volume=info.get('volume', 0),
+            pe_ratio=info.get('trailingPE', 0),
+            high_52w=info.get('fiftyTwoWeekHigh', 0),
+            low_52w=info.get('fiftyTwoWeekLow', 0)
+        )
+
+
+class Quote:
+    """Cotización de un símbolo: último precio, cierre anterior y volumen de la sesión"""
+
+    __slots__ = ("price", "prev_close", "volume", "time")
+
+    def __init__(self, price, prev_close, volume=0, time=None):
+        self.price = price
+        self.prev_close = prev_close
+        self.volume = volume
+        self.time = time
+
+    @classmethod
+    def from_daily(cls, hist):
+        """Cotización a partir de las últimas barras diarias (la de hoy, si hay sesión)"""
+        close = hist["Close"].to_numpy(dtype="float64")
+        return cls(
+            price=float(close[-1]),
+            prev_close=float(close[-2]) if len(close) > 1 else float(close[-1]),
+            volume=int(np.nan_to_num(hist["Volume"].iloc[-1])) if "Volume" in hist.columns else 0,
+            time=hist.index[-1]
+        )
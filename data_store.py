@@ -0,0 +1,174 @@
+"""
+Almacén local de históricos OHLCV
+Guarda en SQLite las barras de cada símbolo e intervalo para que las
+actualizaciones solo tengan que descargar las barras nuevas
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+STORE_FILE = os.environ.get("NASDAQ_STORE_FILE", "market_data.db")
+
+# Zona horaria de la bolsa: las barras se guardan en UTC y se devuelven en hora de Nueva York
+EXCHANGE_TZ = "America/New_York"
+
+# Columnas de Ticker.history y su nombre en la tabla
+COLUMNS = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Volume": "volume",
+    "Dividends": "dividends",
+    "Stock Splits": "splits"
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL,
+    volume REAL, dividends REAL, splits REAL,
+    PRIMARY KEY (symbol, interval, ts)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS coverage (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    period TEXT NOT NULL,
+    refreshed_at REAL NOT NULL,
+    full_at REAL,
+    PRIMARY KEY (symbol, interval)
+);
+"""
+
+
+class OHLCVStore:
+    """Históricos OHLCV persistentes por símbolo e intervalo
+
+    Además de las barras guarda, para cada símbolo e intervalo, el período más largo
+    descargado completo (coverage), la hora de la última actualización y la de la última
+    descarga completa.
+    """
+
+    def __init__(self, path=STORE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+            # Almacenes creados antes de guardar la hora de la descarga completa
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(coverage)")]
+            if "full_at" not in columns:
+                self._conn.execute("ALTER TABLE coverage ADD COLUMN full_at REAL")
+
+    def last_timestamp(self, symbol, interval):
+        """Marca de tiempo (UTC) de la última barra guardada, o None si no hay datos"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(ts) FROM bars WHERE symbol = ? AND interval = ?",
+                (symbol, interval)
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return pd.Timestamp(row[0], unit="s", tz="UTC")
+
+    def coverage(self, symbol, interval):
+        """Período descargado completo, hora de la última actualización y de la última
+        descarga completa (o (None, None, None))"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT period, refreshed_at, full_at FROM coverage WHERE symbol = ? AND interval = ?",
+                (symbol, interval)
+            ).fetchone()
+        return row if row else (None, None, None)
+
+    def set_coverage(self, symbol, interval, period, refreshed_at=None):
+        """Registrar el período cubierto tras una descarga completa y su hora"""
+        refreshed_at = time.time() if refreshed_at is None else refreshed_at
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO coverage (symbol, interval, period, refreshed_at, full_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (symbol, interval, period, refreshed_at, refreshed_at)
+            )
+
+    def touch(self, symbol, interval, refreshed_at=None):
+        """Actualizar solo la hora de la última actualización"""
+        refreshed_at = time.time() if refreshed_at is None else refreshed_at
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE coverage SET refreshed_at = ? WHERE symbol = ? AND interval = ?",
+                (refreshed_at, symbol, interval)
+            )
+
+    def append(self, symbol, interval, hist):
+        """Añadir (o sustituir) las barras de un DataFrame con el formato de Ticker.history"""
+        if hist is None or len(hist) == 0:
+            return 0
+        index = hist.index
+        if index.tz is None:
+            index = index.tz_localize(EXCHANGE_TZ)
+        ts = index.tz_convert("UTC").asi8 // 10**9
+
+        values = [ts]
+        for column in COLUMNS:
+            if column in hist.columns:
+                values.append(hist[column].to_numpy(dtype="float64", na_value=np.nan))
+            else:
+                values.append(np.zeros(len(hist)))
+        rows = [(symbol, interval, *row) for row in zip(*(v.tolist() for v in values))]
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO bars (symbol, interval, ts, open, high, low, close, volume, dividends, splits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def load(self, symbol, interval, start=None):
+        """Cargar las barras de un símbolo e intervalo (desde start, si se indica)"""
+        query = "SELECT ts, open, high, low, close, volume, dividends, splits FROM bars WHERE symbol = ? AND interval = ?"
+        params = [symbol, interval]
+        if start is not None:
+            query += " AND ts >= ?"
+            params.append(int(pd.Timestamp(start).timestamp()))
+        query += " ORDER BY ts"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return self._frame(rows, interval)
+
+    def tail(self, symbol, interval, count):
+        """Cargar las últimas count barras de un símbolo e intervalo"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ts, open, high, low, close, volume, dividends, splits FROM bars "
+                "WHERE symbol = ? AND interval = ? ORDER BY ts DESC LIMIT ?",
+                (symbol, interval, count)
+            ).fetchall()
+        return self._frame(rows[::-1], interval)
+
+    @staticmethod
+    def _frame(rows, interval):
+        """DataFrame con el formato de Ticker.history a partir de filas de la tabla bars"""
+        array = np.array(rows, dtype="float64").reshape(-1, len(COLUMNS) + 1)
+        index = pd.DatetimeIndex(pd.to_datetime(array[:, 0].astype("int64"), unit="s", utc=True))
+        hist = pd.DataFrame(array[:, 1:], index=index.tz_convert(EXCHANGE_TZ), columns=list(COLUMNS))
+        hist.index.name = "Date" if interval == "1d" else "Datetime"
+        return hist
+
+    def prune(self, symbol, interval, before):
+        """Borrar las barras anteriores a una fecha (para limitar los intradía)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM bars WHERE symbol = ? AND interval = ? AND ts < ?",
+                (symbol, interval, int(pd.Timestamp(before).timestamp()))
+            )
@@ -0,0 +1,64 @@
+"""
+Zona horaria de visualización
+Marcas de tiempo de los históricos en la hora local que se muestra en los gráficos,
+guardadas junto a cada histórico cacheado: se calculan una vez por refresco y zona
+horaria y se comparten como arrays de solo lectura
+"""
+
+import weakref
+
+# Zonas horarias que se pueden elegir y su nombre en la interfaz
+DISPLAY_TIMEZONES = {
+    "Europe/Madrid": "España",
+    "Europe/London": "Londres",
+    "America/New_York": "Nueva York",
+    "America/Chicago": "Chicago",
+    "America/Los_Angeles": "Los Ángeles",
+    "America/Mexico_City": "Ciudad de México",
+    "America/Bogota": "Bogotá",
+    "America/Argentina/Buenos_Aires": "Buenos Aires",
+    "UTC": "UTC",
+}
+
+
+def wall_clock_ms(index, tz=None):
+    """Milisegundos de la hora local de un DatetimeIndex (en tz, o en la suya si no se indica)
+
+    Es la hora que muestra un eje de fechas de Plotly; el array es float64 (se envía en
+    binario) y de solo lectura, para poder compartirlo.
+    """
+    if tz is not None:
+        index = index.tz_convert(tz)
+    times = (index.tz_localize(None).asi8 // 1_000_000).astype("float64")
+    times.flags.writeable = False
+    return times
+
+
+# id(serie) -> (referencia débil a la serie, {zona: marcas de tiempo})
+_series_times = {}
+
+
+def _forget(key, ref):
+    """Olvidar las marcas de tiempo de una serie que ya no existe"""
+    entry = _series_times.get(key)
+    if entry is not None and entry[0] is ref:
+        del _series_times[key]
+
+
+def series_times(series, tz=None):
+    """wall_clock_ms(series.index, tz), calculado una sola vez por serie y zona horaria
+
+    series es un histórico (DataFrame) o cualquier objeto con index compartido y que no
+    se modifica; sus marcas de tiempo convertidas se guardan mientras exista, así que
+    se recalculan solo cuando un refresco crea series nuevas.
+    """
+    key = id(series)
+    entry = _series_times.get(key)
+    if entry is None or entry[0]() is not series:
+        ref = weakref.ref(series, lambda ref, key=key: _forget(key, ref))
+        entry = _series_times[key] = (ref, {})
+    zone = tz.zone if tz is not None else None
+    times = entry[1].get(zone)
+    if times is None:
+        times = entry[1][zone] = wall_clock_ms(series.index, tz)
+    return times
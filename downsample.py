@@ -0,0 +1,62 @@
+"""
+Reducción de puntos de las series de los gráficos
+Largest-Triangle-Three-Buckets (LTTB): conserva la forma de la línea (picos y
+valles) con un número de puntos acotado, para no enviar al navegador una barra por
+punto en los períodos largos o con muchas barras intradía
+"""
+
+import numpy as np
+
+
+def lttb_indices(x, y, max_points):
+    """Índices de los puntos que conserva LTTB (como mucho max_points)
+
+    El primer y el último punto se conservan siempre; el resto se reparte en
+    max_points - 2 grupos y de cada grupo se elige el punto que forma el triángulo de
+    mayor área con el punto elegido del grupo anterior y la media del siguiente.
+    """
+    n = len(y)
+    if max_points is None or max_points < 3 or n <= max_points:
+        return np.arange(n)
+    # x relativo al primero para no perder precisión con marcas de tiempo en ns
+    x = np.asarray(x, dtype="float64") - float(x[0])
+    y = np.asarray(y, dtype="float64")
+
+    # Límites de los grupos (sin el primer y el último punto) y media de cada uno
+    edges = np.linspace(1, n - 1, max_points - 1).astype("int64")
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    mean_y = np.add.reduceat(np.nan_to_num(y[1:n - 1]), edges[:-1] - 1) / counts
+    # El "siguiente" del último grupo es el último punto
+    next_x = np.r_[mean_x[1:], x[-1]]
+    next_y = np.r_[mean_y[1:], y[-1]]
+
+    # Área (doble) del triángulo con el punto anterior (ax, ay) y la media del siguiente
+    # grupo: |ax * A + ay * B + C|, con A, B y C fijos para cada punto. Se calculan de
+    # una vez en una matriz grupos x puntos (rellena con ceros), así que en el recorrido
+    # solo queda una operación por grupo
+    groups = len(counts)
+    width = int(counts.max())
+    rows = np.repeat(np.arange(groups), counts)
+    cols = np.arange(n - 2) - np.repeat(edges[:-1] - 1, counts)
+    px, py = x[1:n - 1], y[1:n - 1]
+    nx, ny = next_x[rows], next_y[rows]
+    A = np.zeros((groups, width))
+    B = np.zeros((groups, width))
+    C = np.zeros((groups, width))
+    A[rows, cols] = py - ny
+    B[rows, cols] = nx - px
+    C[rows, cols] = px * ny - nx * py
+    # Los puntos sin valor tienen área 0 y solo se eligen si todo el grupo está vacío
+    A, B, C = np.nan_to_num(A), np.nan_to_num(B), np.nan_to_num(C)
+
+    selected = np.empty(max_points, dtype="int64")
+    selected[0], selected[-1] = 0, n - 1
+    x_list, y_list = x.tolist(), np.nan_to_num(y).tolist()
+    ax, ay = 0.0, y_list[0]
+    for i in range(groups):
+        best = int(edges[i]) + int(np.abs(ax * A[i] + ay * B[i] + C[i]).argmax())
+        selected[i + 1] = best
+        ax, ay = x_list[best], y_list[best]
+    return selected
+
@@ -0,0 +1,197 @@
+"""
+Calendario de sesiones del NASDAQ
+Festivos, cierres anticipados y horario de cada sesión (con los cambios de horario
+de EE. UU. y Europa) para decidir cuándo tiene sentido volver a pedir datos
+"""
+
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+import pytz
+
+EXCHANGE_TZ = pytz.timezone("America/New_York")
+DISPLAY_TZ = pytz.timezone("Europe/Madrid")
+
+REGULAR_OPEN = time(9, 30)
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+# Los datos gratuitos llegan con ~15 minutos de retraso: tras el cierre se sigue
+# actualizando un rato para recoger las últimas barras
+POST_CLOSE_GRACE = timedelta(minutes=20)
+
+# Cierres extraordinarios que no siguen ninguna regla (p. ej. lutos nacionales)
+SPECIAL_CLOSURES = {
+    date(2018, 12, 5): "Luto nacional (George H. W. Bush)",
+    date(2025, 1, 9): "Luto nacional (Jimmy Carter)",
+}
+
+
+def _nth_weekday(year, month, weekday, n):
+    """n-ésimo día de la semana del mes (n=-1 para el último)"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year, month + 1, 1) - timedelta(days=1) if month < 12 else date(year, 12, 31)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    """Domingo de Pascua (algoritmo gregoriano anónimo)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _observed(day):
+    """Día en que se cierra por un festivo: sábado -> viernes, domingo -> lunes"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def holidays(year):
+    """Festivos del mercado en un año: {fecha: nombre}"""
+    days = {}
+
+    # Año Nuevo en sábado no se traslada al viernes anterior
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days[_observed(new_year)] = "Año Nuevo"
+
+    days[_nth_weekday(year, 1, 0, 3)] = "Martin Luther King Jr."
+    days[_nth_weekday(year, 2, 0, 3)] = "Día de los Presidentes"
+    days[_easter(year) - timedelta(days=2)] = "Viernes Santo"
+    days[_nth_weekday(year, 5, 0, -1)] = "Memorial Day"
+    if year >= 2022:
+        days[_observed(date(year, 6, 19))] = "Juneteenth"
+    days[_observed(date(year, 7, 4))] = "Día de la Independencia"
+    days[_nth_weekday(year, 9, 0, 1)] = "Labor Day"
+    days[_nth_weekday(year, 11, 3, 4)] = "Acción de Gracias"
+    days[_observed(date(year, 12, 25))] = "Navidad"
+
+    days.update({d: name for d, name in SPECIAL_CLOSURES.items() if d.year == year})
+    return days
+
+
+@lru_cache(maxsize=None)
+def early_closes(year):
+    """Días con cierre anticipado (13:00 Nueva York)"""
+    days = set()
+
+    # Víspera de la Independencia y Nochebuena, solo de lunes a jueves
+    for eve in (date(year, 7, 3), date(year, 12, 24)):
+        if eve.weekday() < 4:
+            days.add(eve)
+
+    # Viernes posterior a Acción de Gracias
+    days.add(_nth_weekday(year, 11, 3, 4) + timedelta(days=1))
+    return {d for d in days if d not in holidays(year)}
+
+
+def is_trading_day(day):
+    """Indica si hay sesión ese día"""
+    return day.weekday() < 5 and day not in holidays(day.year)
+
+
+def session(day):
+    """Apertura y cierre (hora de Nueva York) de la sesión de un día, o None si no hay sesión"""
+    if not is_trading_day(day):
+        return None
+    close = EARLY_CLOSE if day in early_closes(day.year) else REGULAR_CLOSE
+    return (EXCHANGE_TZ.localize(datetime.combine(day, REGULAR_OPEN)),
+            EXCHANGE_TZ.localize(datetime.combine(day, close)))
+
+
+def session_in_tz(day, tz=DISPLAY_TZ):
+    """Sesión de un día convertida a otra zona horaria (por defecto la de España)"""
+    bounds = session(day)
+    if bounds is None:
+        return None
+    return tuple(t.astimezone(tz) for t in bounds)
+
+
+def _now(now=None):
+    """Hora actual en Nueva York (acepta datetime con zona horaria)"""
+    if now is None:
+        return datetime.now(EXCHANGE_TZ)
+    return now.astimezone(EXCHANGE_TZ)
+
+
+def is_open(now=None):
+    """Indica si el mercado está abierto"""
+    now = _now(now)
+    bounds = session(now.date())
+    return bounds is not None and bounds[0] <= now < bounds[1]
+
+
+def is_active(now=None):
+    """Indica si los datos pueden cambiar: sesión abierta o recién cerrada (POST_CLOSE_GRACE)"""
+    now = _now(now)
+    bounds = session(now.date())
+    return bounds is not None and bounds[0] <= now < bounds[1] + POST_CLOSE_GRACE
+
+
+def next_open(now=None):
+    """Próxima apertura posterior a now"""
+    now = _now(now)
+    day = now.date()
+    while True:
+        bounds = session(day)
+        if bounds is not None and bounds[0] > now:
+            return bounds[0]
+        day += timedelta(days=1)
+
+
+def last_session_day(now=None):
+    """Día de la última sesión que ya ha empezado"""
+    now = _now(now)
+    day = now.date()
+    while True:
+        bounds = session(day)
+        if bounds is not None and bounds[0] <= now:
+            return day
+        day -= timedelta(days=1)
+
+
+def cache_epoch(ttl, now=None):
+    """Clave de validez para la caché
+
+    Con el mercado activo cambia cada ttl segundos; con el mercado cerrado se mantiene
+    hasta la próxima apertura, así que los datos no se vuelven a pedir en toda la noche
+    o el fin de semana.
+    """
+    now = _now(now)
+    if is_active(now):
+        return int(now.timestamp() // ttl)
+    return f"cerrado-{next_open(now):%Y%m%d}"
+
+
+def seconds_until_refresh(ttl, now=None):
+    """Segundos hasta la próxima actualización útil: ttl con el mercado activo,
+    o el tiempo hasta la apertura con el mercado cerrado"""
+    now = _now(now)
+    if is_active(now):
+        return ttl
+    return max(ttl, int((next_open(now) - now).total_seconds()))
+
+
+def status_text(now=None, tz=DISPLAY_TZ):
+    """Texto breve con el estado del mercado (en la zona horaria indicada)"""
+    now = _now(now)
+    if is_open(now):
+        close = session(now.date())[1].astimezone(tz)
+        return f"🟢 Mercado abierto · cierra a las {close:%H:%M}"
+    opening = next_open(now).astimezone(tz)
+    return f"🔴 Mercado cerrado · abre {opening:%d/%m} a las {opening:%H:%M}"
@@ -0,0 +1,601 @@
+"""
+Capa de datos de mercado
+Descarga agrupada de históricos (a través de un proveedor intercambiable), almacén local y cachés de históricos y fundamentales,
+sin depender de Streamlit para poder usarse desde el sondeo en segundo plano
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytz
+
+import market_calendar
+import providers
+import resilience
+from resample import resample_ohlcv
+from caching import EpochCache, SingleFlight
+from compact import CompactHistory, Fundamentals
+from data_store import OHLCVStore
+
+logger = logging.getLogger("nasdaq_web")
+
+# Descarga concurrente: número máximo de hilos por llamada y plazo por símbolo (segundos)
+FETCH_MAX_WORKERS = int(os.environ.get("NASDAQ_FETCH_WORKERS", "8"))
+FETCH_TIMEOUT = float(os.environ.get("NASDAQ_FETCH_TIMEOUT", "10"))
+
+# Hilos del pool compartido: más que los de una llamada, para que las llamadas colgadas
+# (que siguen ocupando su hilo hasta que terminan) no dejen sin hilos al resto
+FETCH_POOL_SIZE = int(os.environ.get("NASDAQ_FETCH_POOL", str(4 * FETCH_MAX_WORKERS)))
+
+# Símbolos por petición agrupada al proveedor (las listas grandes se piden por lotes)
+FETCH_BATCH_SIZE = int(os.environ.get("NASDAQ_FETCH_BATCH", "50"))
+
+# TTL de la caché de fundamentales (no dependen del período del gráfico)
+FUNDAMENTALS_TTL = 3600
+
+# TTL de la caché de cotizaciones (precio, cierre anterior y volumen)
+QUOTE_TTL = 60
+
+# Vista del sondeo con solo las cotizaciones (sin históricos ni fundamentales)
+QUOTES = "quotes"
+
+# Prefijo de las vistas del sondeo con solo los históricos de un período (sin
+# fundamentales), p. ej. "historicos:1mo" (ver history_view)
+HISTORIES = "historicos:"
+
+# TTL de la caché negativa: un símbolo que falla no se vuelve a pedir hasta pasado este
+# tiempo (o hasta la próxima apertura con el mercado cerrado), y entonces se reintenta
+# solo ese símbolo
+NEGATIVE_TTL = int(os.environ.get("NASDAQ_NEGATIVE_TTL", "60"))
+
+# Período diario más largo: los demás períodos diarios se sirven como recortes de este
+LONGEST_DAILY_PERIOD = "5y"
+
+# Histórico intradía base: barras de 1 minuto de las últimas sesiones, de las que se
+# sacan por remuestreo local los períodos 1d y 5d con cualquier intervalo
+INTRADAY_INTERVAL = "1m"
+INTRADAY_BASE_PERIOD = "5d"
+
+# Intervalo con el que se muestra cada período intradía si no se elige otro
+DEFAULT_INTERVALS = {"1d": "5m", "5d": "15m"}
+
+# TTL de la caché de históricos: el intradía base y el histórico diario base
+# (todos los períodos diarios comparten el TTL de LONGEST_DAILY_PERIOD)
+HISTORY_TTL = {INTRADAY_BASE_PERIOD: 120, LONGEST_DAILY_PERIOD: 300}
+
+# Orden de los períodos, para saber si el almacén local ya cubre el período pedido
+PERIOD_ORDER = ["1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y"]
+
+# Ventana temporal de cada período diario
+PERIOD_OFFSETS = {
+    "1mo": pd.DateOffset(months=1), "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6), "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2), "5y": pd.DateOffset(years=5)
+}
+
+# Sesiones de mercado que muestran los períodos intradía
+PERIOD_SESSIONS = {"1d": 1, "5d": 5}
+
+# Días naturales que se leen del almacén para los períodos intradía (cubren 5 sesiones
+# aunque haya fin de semana y festivos en medio)
+SESSION_LOOKBACK = pd.Timedelta(days=10)
+
+# Los intradía solo se conservan unos días en el almacén local
+INTRADAY_RETENTION = pd.Timedelta(days=30)
+
+# Tiempo máximo desde la última descarga completa: pasado este tiempo se vuelve a
+# descargar el período entero en lugar de solo las barras nuevas. Yahoo solo sirve unos
+# pocos días de barras de 1 minuto por petición, y los precios diarios ajustados se
+# revisan periódicamente por si algún ajuste no se ha detectado en las incrementales
+MAX_INCREMENTAL_AGE = {
+    "1m": pd.Timedelta(days=5).total_seconds(),
+    "1d": pd.Timedelta(days=7).total_seconds()
+}
+
+# Diferencia relativa a partir de la cual un cierre ya guardado se considera revisado
+RESTATED_TOLERANCE = 1e-6
+
+# Estado compartido por todo el proceso
+_store = None
+_store_lock = threading.Lock()
+_provider = None
+_provider_lock = threading.Lock()
+_fetch_pool = None
+_fetch_pool_lock = threading.Lock()
+_history_cache = EpochCache(max_entries=1000)
+_fundamentals_cache = EpochCache(max_entries=1000)
+_quote_cache = EpochCache(max_entries=1000)
+_download_flight = SingleFlight()
+
+# Métricas de la última carga de datos
+FETCH_STATS = {"latency": None, "symbols": 0, "errors": 0, "fetched_at": None}
+
+
+def get_provider():
+    """Proveedor de datos de mercado del proceso (ver providers.provider_from_env)
+
+    Se envuelve con el limitador de peticiones, los reintentos y el circuit breaker.
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = resilience.ResilientProvider(providers.provider_from_env())
+            logger.info("Proveedor de datos de mercado: %s", _provider.name)
+        return _provider
+
+
+def set_provider(provider):
+    """Sustituir el proveedor de datos (p. ej. por un ReplayProvider en pruebas)"""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+    _history_cache.clear()
+    _fundamentals_cache.clear()
+    _quote_cache.clear()
+
+
+def provider_stats():
+    """Estado del circuit breaker y contadores del proveedor (None si no es resiliente)"""
+    provider = get_provider()
+    if isinstance(provider, resilience.ResilientProvider):
+        return provider.stats()
+    return None
+
+
+def batches(symbols, size=None):
+    """Dividir una lista de símbolos en lotes de FETCH_BATCH_SIZE"""
+    size = size or FETCH_BATCH_SIZE
+    symbols = list(symbols)
+    return [symbols[i:i + size] for i in range(0, len(symbols), size)]
+
+
+def download_history(symbols, period=None, interval="1d", start=None):
+    """Descargar el histórico OHLCV de varios símbolos con peticiones agrupadas por lotes
+    
+    Con start se descargan solo las barras desde esa fecha (se ignora period).
+    """
+    histories = {}
+    for batch in batches(symbols):
+        histories.update(get_provider().history(batch, period, interval, start))
+    return histories
+
+
+def get_fetch_pool():
+    """Pool de hilos de las descargas concurrentes, compartido por todo el proceso"""
+    global _fetch_pool
+    with _fetch_pool_lock:
+        if _fetch_pool is None:
+            _fetch_pool = ThreadPoolExecutor(max_workers=FETCH_POOL_SIZE, thread_name_prefix="fetch")
+        return _fetch_pool
+
+
+def fetch_concurrently(fetch, symbols, max_workers=FETCH_MAX_WORKERS, timeout=FETCH_TIMEOUT):
+    """Ejecutar fetch(symbol) en paralelo con un plazo máximo por símbolo
+    
+    Devuelve (resultados, errores). Los símbolos que fallan o superan el plazo
+    quedan con resultado None y su excepción en errores. Se ejecutan como mucho
+    max_workers a la vez en el pool compartido (get_fetch_pool); un símbolo que supera
+    su plazo deja de contar, así que los que esperan no se bloquean detrás de una
+    llamada colgada. Además hay un plazo total (el de cada tanda de max_workers
+    símbolos) por si el pool entero está ocupado.
+    """
+    results = {symbol: None for symbol in symbols}
+    errors = {}
+    if not symbols:
+        return results, errors
+    
+    started = {}
+    
+    def run(symbol):
+        started[symbol] = time.monotonic()
+        return fetch(symbol)
+    
+    pool = get_fetch_pool()
+    workers = max(1, min(max_workers, len(symbols)))
+    deadline = time.monotonic() + timeout * math.ceil(len(symbols) / workers)
+    queued = list(symbols)
+    running = {}
+    while queued or running:
+        while queued and len(running) < workers:
+            symbol = queued.pop(0)
+            running[pool.submit(run, symbol)] = symbol
+        
+        # Esperar hasta que termine una tarea o venza el plazo más próximo
+        now = time.monotonic()
+        deadlines = [started[symbol] + timeout for symbol in running.values() if symbol in started]
+        wait_for = max(0, min(deadlines + [deadline]) - now)
+        done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+        
+        for future in done:
+            symbol = running.pop(future)
+            try:
+                results[symbol] = future.result()
+            except Exception as e:
+                errors[symbol] = e
+        
+        # Abandonar los símbolos que han superado su plazo o el total (el hilo vuelve
+        # al pool cuando termine la llamada)
+        now = time.monotonic()
+        for future, symbol in list(running.items()):
+            if symbol in started and (now >= deadline or now - started[symbol] >= timeout):
+                errors[symbol] = TimeoutError(f"sin respuesta en {timeout:.1f} s")
+            elif now >= deadline:
+                future.cancel()
+                errors[symbol] = TimeoutError("sin empezar dentro del plazo total")
+            else:
+                continue
+            del running[future]
+        if now >= deadline:
+            for symbol in queued:
+                errors[symbol] = TimeoutError("sin empezar dentro del plazo total")
+            queued = []
+    return results, errors
+
+
+def history_epoch(period, now=None):
+    """Ventana de validez actual del histórico de un período
+    
+    Cambia cada HISTORY_TTL segundos con el mercado activo y se mantiene hasta la
+    próxima apertura con el mercado cerrado (ver market_calendar.cache_epoch).
+    """
+    now = time.time() if now is None else now
+    ttl = HISTORY_TTL.get(period, HISTORY_TTL[LONGEST_DAILY_PERIOD])
+    return market_calendar.cache_epoch(ttl, datetime.fromtimestamp(now, tz=pytz.utc))
+
+
+def get_store():
+    """Almacén local de históricos, compartido por todo el proceso"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = OHLCVStore()
+        return _store
+
+
+def slice_window(hist, period):
+    """Recortar un histórico a la ventana de un período (últimas sesiones o intervalo de fechas)"""
+    if len(hist) == 0:
+        return hist
+    if period in PERIOD_SESSIONS:
+        sessions = hist.index.normalize().unique()
+        start = sessions[-min(PERIOD_SESSIONS[period], len(sessions))]
+    else:
+        start = pd.Timestamp.now(tz=hist.index.tz) - PERIOD_OFFSETS[period]
+    return hist.iloc[hist.index.searchsorted(start):]
+
+
+def fetch_full(symbols, period, interval, now):
+    """Descargar el período completo de varios símbolos y guardarlo en el almacén"""
+    store = get_store()
+    fetched = download_history(symbols, period, interval)
+    for symbol in symbols:
+        if store.append(symbol, interval, fetched[symbol]):
+            store.set_coverage(symbol, interval, period, now)
+    return {(symbol, period, interval): len(fetched[symbol]) for symbol in symbols}
+
+
+def is_restated(stored, fetched):
+    """Si las barras descargadas cambian el histórico ya guardado de un símbolo
+
+    Con precios ajustados, un split o un dividendo nuevo recalcula todos los cierres
+    anteriores, y un cierre ya guardado que no coincide indica que se han revisado. La
+    última barra guardada no se compara (puede ser la de una sesión aún abierta).
+    """
+    if len(fetched) == 0:
+        return False
+    actions = fetched[["Dividends", "Stock Splits"]].fillna(0)
+    known = stored[["Dividends", "Stock Splits"]].reindex(actions.index).fillna(0)
+    if ((actions != 0) & (actions != known)).to_numpy().any():
+        return True
+    closed = stored["Close"].iloc[:-1]
+    overlap = closed.index.intersection(fetched.index)
+    if len(overlap) == 0:
+        return False
+    before = closed.loc[overlap].to_numpy()
+    after = fetched["Close"].loc[overlap].to_numpy()
+    return not np.allclose(after, before, rtol=RESTATED_TOLERANCE, atol=0)
+
+
+def fetch_incremental(symbols, period, interval, now):
+    """Descargar solo las barras nuevas de varios símbolos y añadirlas al almacén
+
+    Los símbolos cuyo histórico ajustado ha cambiado (ver is_restated) se vuelven a
+    descargar enteros.
+    """
+    store = get_store()
+    # Una sola descarga desde la penúltima barra más antigua: la última barra se
+    # sustituye y la anterior, ya cerrada, sirve para detectar ajustes
+    stored = {symbol: store.tail(symbol, interval, 2) for symbol in symbols}
+    since = min(hist.index[0] for hist in stored.values())
+    try:
+        fetched = download_history(symbols, interval=interval, start=since)
+        restated = [symbol for symbol in symbols if is_restated(stored[symbol], fetched[symbol])]
+        for symbol in symbols:
+            if symbol not in restated and store.append(symbol, interval, fetched[symbol]):
+                store.touch(symbol, interval, now)
+        logger.info("Actualización incremental %s de %d símbolos desde %s",
+                    interval, len(symbols), since)
+    except Exception as e:
+        # Sin red se sirve lo que haya en el almacén
+        logger.warning("Actualización incremental %s fallida: %s", interval, e)
+        return {}
+    counts = {(symbol, period, interval): len(fetched[symbol]) for symbol in symbols}
+    if restated:
+        logger.info("Históricos %s ajustados (splits, dividendos o cierres revisados): %s",
+                    interval, ", ".join(restated))
+        try:
+            counts.update(fetch_full(restated, period, interval, now))
+        except Exception as e:
+            logger.warning("Descarga completa %s tras un ajuste fallida: %s", interval, e)
+    return counts
+
+
+def store_history(symbols, period, interval="1d"):
+    """Histórico de varios símbolos servido desde el almacén local
+    
+    Los símbolos que ya tienen el período completo en el almacén solo descargan las
+    barras posteriores a la última guardada (y nada si se actualizaron en la ventana
+    actual de HISTORY_TTL). El resto se descarga entero una vez. Se devuelve la ventana
+    del período, recortada sobre los arrays del índice sin recorrer las filas.
+    """
+    store = get_store()
+    now = time.time()
+    epoch = history_epoch(period, now)
+    max_age = MAX_INCREMENTAL_AGE.get(interval)
+    
+    full, incremental = [], []
+    for symbol in symbols:
+        covered, refreshed_at, full_at = store.coverage(symbol, interval)
+        if covered is None or PERIOD_ORDER.index(covered) < PERIOD_ORDER.index(period):
+            full.append(symbol)
+        elif max_age is not None and now - (full_at or 0) > max_age:
+            full.append(symbol)
+        elif history_epoch(period, refreshed_at) != epoch:
+            incremental.append(symbol)
+    
+    # Descargas agrupadas por (símbolo, período, intervalo): si otra sesión ya está
+    # descargando un símbolo, se espera a su descarga en lugar de repetirla
+    if full:
+        _download_flight.do_many(
+            [(symbol, period, interval) for symbol in full],
+            lambda keys: fetch_full([k[0] for k in keys], period, interval, now)
+        )
+    if incremental:
+        _download_flight.do_many(
+            [(symbol, period, interval) for symbol in incremental],
+            lambda keys: fetch_incremental([k[0] for k in keys], period, interval, now)
+        )
+    
+    histories = {}
+    for symbol in symbols:
+        if interval != "1d" and (symbol in full or symbol in incremental):
+            store.prune(symbol, interval, pd.Timestamp.now(tz="UTC") - INTRADAY_RETENTION)
+        if period in PERIOD_OFFSETS:
+            start = pd.Timestamp.now(tz="UTC") - PERIOD_OFFSETS[period]
+        else:
+            start = pd.Timestamp.now(tz="UTC") - SESSION_LOOKBACK
+        histories[symbol] = slice_window(store.load(symbol, interval, start), period)
+    return histories
+
+
+def load_base_history(symbols, period):
+    """Cargar un histórico base: el intradía de 1 minuto, o el diario más largo"""
+    start = time.perf_counter()
+    if period == INTRADAY_BASE_PERIOD:
+        histories = store_history(symbols, INTRADAY_BASE_PERIOD, INTRADAY_INTERVAL)
+    else:
+        histories = store_history(symbols, LONGEST_DAILY_PERIOD)
+    logger.info("Histórico %s de %d símbolos cargado en %.2f s",
+                period, len(symbols), time.perf_counter() - start)
+    return histories
+
+
+def retry_epoch(now=None):
+    """Ventana de validez de los fallos cacheados
+    
+    Cambia cada NEGATIVE_TTL segundos con el mercado activo; con el mercado cerrado los
+    fallos se mantienen hasta la próxima apertura (ver market_calendar.cache_epoch).
+    """
+    now = time.time() if now is None else now
+    return market_calendar.cache_epoch(NEGATIVE_TTL, datetime.fromtimestamp(now, tz=pytz.utc))
+
+
+def get_price_history(symbols, period, interval=None):
+    """Obtener el histórico de precios de varios símbolos para un período
+    
+    Cada símbolo tiene su propia entrada de caché (en formato compacto, ver
+    CompactHistory) y solo se descargan (en un único lote) los que faltan o han
+    caducado. Un histórico vacío cuenta como fallo y se reintenta
+    pasado NEGATIVE_TTL. Todos los períodos diarios comparten la entrada del histórico
+    más largo y se devuelven como recortes de ella (vistas, sin copiar datos); los
+    intradía se remuestrean desde las barras de 1 minuto al intervalo pedido (por
+    defecto, el de DEFAULT_INTERVALS). Los símbolos sin histórico quedan con la excepción.
+    """
+    intraday = period in PERIOD_SESSIONS
+    base_period = INTRADAY_BASE_PERIOD if intraday else LONGEST_DAILY_PERIOD
+    
+    def load(keys):
+        try:
+            histories = load_base_history([symbol for symbol, _ in keys], base_period)
+        except Exception as e:
+            # La descarga ha fallado (tras los reintentos): todos los símbolos del lote
+            # cuentan como fallidos y se reintentan pasado NEGATIVE_TTL
+            logger.warning("Histórico %s de %d símbolos fallido: %s", base_period, len(keys), e)
+            return {key: e for key in keys}
+        return {
+            (symbol, base_period): CompactHistory.from_frame(hist) if len(hist) > 0
+            else LookupError(f"{symbol}: histórico vacío")
+            for symbol, hist in histories.items()
+        }
+    
+    entries = _history_cache.get_many(
+        [(symbol, base_period) for symbol in symbols],
+        load,
+        history_epoch(base_period),
+        retry_epoch()
+    )
+    histories = {}
+    for (symbol, _), entry in entries.items():
+        if isinstance(entry, Exception):
+            # Sin histórico: load_stock_data deja el símbolo a None
+            histories[symbol] = entry
+            continue
+        hist = entry.to_frame()
+        if base_period != period:
+            hist = slice_window(hist, period)
+        if intraday:
+            hist = resample_ohlcv(hist, interval or DEFAULT_INTERVALS[period])
+        histories[symbol] = hist
+    return histories
+
+
+def get_fundamentals(symbol):
+    """Obtener los datos fundamentales de un símbolo, compartidos por todos los períodos
+    
+    Se renuevan cada FUNDAMENTALS_TTL con el mercado activo (ver market_calendar.cache_epoch);
+    si fallan, se reintentan pasado NEGATIVE_TTL.
+    """
+    return _fundamentals_cache.get(
+        symbol,
+        lambda: Fundamentals.from_info(get_provider().info(symbol)),
+        market_calendar.cache_epoch(FUNDAMENTALS_TTL),
+        retry_epoch()
+    )
+
+
+def load_stock_data(symbols, period, interval=None):
+    """Cargar los datos de acciones de un período desde las cachés de históricos y fundamentales
+    
+    Los datos de cada símbolo se montan con sus propias entradas de caché, así que un
+    símbolo que falla queda a None sin afectar al resto. Se ejecuta en el hilo del
+    sondeo, así que los errores se registran en el log.
+    """
+    data = {}
+    start = time.perf_counter()
+    
+    # Histórico de todos los símbolos en una única descarga por período/intervalo
+    histories = get_price_history(symbols, period, interval)
+    
+    # ticker.info no admite descarga agrupada: pedirlo en paralelo con plazo por símbolo
+    infos, errors = fetch_concurrently(get_fundamentals, symbols)
+    
+    for symbol in symbols:
+        try:
+            if symbol in errors:
+                raise errors[symbol]
+            hist = histories[symbol]
+            if isinstance(hist, Exception):
+                raise hist
+            info = infos[symbol]
+            prev_close = info.previous_close
+            if prev_close is None:
+                prev_close = float(hist['Close'].iloc[-2]) if len(hist) > 1 else 0
+            data[symbol] = {
+                "history": hist,
+                "info": info,
+                "current_price": float(hist['Close'].iloc[-1]) if len(hist) > 0 else 0,
+                "prev_close": prev_close,
+                "market_cap": info.market_cap,
+                "volume": info.volume,
+                "pe_ratio": info.pe_ratio,
+                "52w_high": info.high_52w,
+                "52w_low": info.low_52w
+            }
+        except Exception as e:
+            logger.warning("Error obteniendo datos de %s: %s", symbol, e)
+            data[symbol] = None
+    
+    latency = time.perf_counter() - start
+    logger.info("Datos de %d símbolos (%s) cargados en %.2f s (%d errores)",
+                len(symbols), period, latency, len(errors))
+    FETCH_STATS.update(latency=latency, symbols=len(symbols), errors=len(errors),
+                             fetched_at=datetime.now(pytz.utc))
+    return data
+
+
+def get_quotes(symbols):
+    """Cotizaciones de varios símbolos: {símbolo: Quote, o la excepción si ha fallado}
+
+    Los que faltan o han caducado (QUOTE_TTL) se piden en una sola llamada al proveedor.
+    """
+    def load(missing):
+        quotes = {}
+        for batch in batches(missing):
+            try:
+                quotes.update(get_provider().quotes(batch))
+            except Exception as e:
+                # Los símbolos del lote quedan como fallidos, sin afectar a los demás lotes
+                quotes.update((symbol, e) for symbol in batch)
+        return {symbol: quotes.get(symbol) or LookupError(f"{symbol}: sin cotización") for symbol in missing}
+    
+    return _quote_cache.get_many(
+        symbols,
+        load,
+        market_calendar.cache_epoch(QUOTE_TTL),
+        retry_epoch()
+    )
+
+
+def load_quotes(symbols):
+    """Cargar las cotizaciones con el formato de los datos de acciones (sin históricos)"""
+    data = {}
+    for symbol, quote in get_quotes(symbols).items():
+        if isinstance(quote, Exception):
+            logger.warning("Error obteniendo la cotización de %s: %s", symbol, quote)
+            data[symbol] = None
+        else:
+            data[symbol] = {
+                "current_price": quote.price,
+                "prev_close": quote.prev_close,
+                "volume": quote.volume
+            }
+    return data
+
+
+def history_view(period):
+    """Vista del sondeo con solo los históricos de un período"""
+    return HISTORIES + period
+
+
+def load_histories(symbols, period):
+    """Cargar solo los históricos de un período, con el formato de los datos de acciones"""
+    data = {}
+    for symbol, hist in get_price_history(symbols, period).items():
+        if isinstance(hist, Exception):
+            logger.warning("Error obteniendo el histórico de %s: %s", symbol, hist)
+            data[symbol] = None
+        else:
+            data[symbol] = {"history": hist}
+    return data
+
+
+def load_view(symbols, view):
+    """Cargar una vista del sondeo: las cotizaciones (QUOTES), solo los históricos de un
+    período (history_view) o los datos completos de un período"""
+    if view == QUOTES:
+        return load_quotes(symbols)
+    if view.startswith(HISTORIES):
+        return load_histories(symbols, view[len(HISTORIES):])
+    return load_stock_data(symbols, view)
+
+
+def cache_memory():
+    """Memoria ocupada por los históricos cacheados (bytes)"""
+    return _history_cache.nbytes(lambda entry: entry.nbytes)
+
+
+def cache_stats():
+    """Contadores de aciertos, fallos y peticiones agrupadas de la capa de datos"""
+    return {
+        "Históricos": _history_cache.stats(),
+        "Fundamentales": _fundamentals_cache.stats(),
+        "Cotizaciones": _quote_cache.stats(),
+        "Descargas": _download_flight.stats()
+    }
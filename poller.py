@@ -0,0 +1,222 @@
+"""
+Sondeo único de datos de mercado
+Un solo hilo por proceso refresca los datos de todas las vistas que se están viendo
+y publica snapshots versionados; las sesiones solo leen el último snapshot
+"""
+
+import logging
+import threading
+import time
+from types import MappingProxyType
+
+from caching import EpochCache, SingleFlight
+
+logger = logging.getLogger("nasdaq_web")
+
+
+def freeze(data):
+    """Versión de solo lectura de los datos de un período: {símbolo: datos o None}
+
+    Los históricos no se copian: todas las sesiones comparten los mismos DataFrames y
+    no deben modificarlos.
+    """
+    return MappingProxyType({
+        symbol: MappingProxyType(dict(value)) if value is not None else None
+        for symbol, value in data.items()
+    })
+
+
+class Snapshot:
+    """Datos publicados por el sondeo: {(símbolos, vista): datos de acciones}
+
+    Es inmutable: cada actualización publica un snapshot nuevo con otra versión, así
+    que las sesiones reciben referencias compartidas en lugar de copias. versions
+    guarda, para cada (símbolos, vista), la versión en la que se publicaron sus datos.
+    """
+
+    __slots__ = ("version", "created_at", "data", "versions")
+
+    def __init__(self, version, created_at, data, versions):
+        self.version = version
+        self.created_at = created_at
+        self.data = data
+        self.versions = versions
+
+
+class MarketDataPoller:
+    """Sondeo de datos de mercado compartido por todas las sesiones
+
+    load(symbols, view) obtiene los datos de una vista (un período o las cotizaciones)
+    para una lista de símbolos e interval() devuelve los segundos hasta la siguiente
+    actualización. Cada suscripción (símbolos, vista) se crea la primera vez que se lee
+    y deja de refrescarse si nadie la lee durante idle_timeout segundos, así que la
+    carga sobre el proveedor no depende del número de sesiones abiertas.
+    Si falla la carga de un símbolo se sigue sirviendo su último dato bueno, marcado
+    como antiguo (ver stale). Mientras haya símbolos sin datos o con datos antiguos y
+    active() sea cierto (p. ej. con el mercado abierto), el siguiente ciclo llega como
+    mucho en retry_interval segundos.
+    """
+
+    def __init__(self, symbols, load, interval, idle_timeout=1800, retry_interval=60, active=None):
+        self.symbols = list(symbols)
+        self._load = load
+        self._interval = interval
+        self._active = active or (lambda: True)
+        self.idle_timeout = idle_timeout
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._last_read = {}
+        self._snapshot = Snapshot(0, None, MappingProxyType({}), MappingProxyType({}))
+        self._thread = None
+        self._flight = SingleFlight()
+        self._views = EpochCache(max_entries=64)
+        self._good_at = {}
+        self._stale = {}
+        self.refreshing = False
+
+    def start(self):
+        """Arrancar el hilo del sondeo"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="market-data-poller", daemon=True)
+            self._thread.start()
+
+    def snapshot(self):
+        """Último snapshot publicado"""
+        return self._snapshot
+
+    def get(self, view, symbols=None):
+        """Datos de una vista en el último snapshot (por defecto, de self.symbols)
+
+        Si nadie la había pedido todavía (o había caducado la suscripción) se carga
+        en el momento y pasa a refrescarse en cada ciclo.
+        """
+        key = (tuple(self.symbols if symbols is None else symbols), view)
+        with self._lock:
+            self._last_read[key] = time.time()
+        data = self._snapshot.data.get(key)
+        if data is None:
+            # Si varias sesiones piden a la vez una vista nueva, se carga una sola vez
+            data = self._flight.do(key, lambda: self._load_first(key))
+        return data
+
+    def _load_first(self, key):
+        """Primera carga de una suscripción (o la del snapshot si otra sesión se adelantó)"""
+        data = self._snapshot.data.get(key)
+        if data is None:
+            data = self._keep_last_good(key, self._load(list(key[0]), key[1]))
+            self._publish({key: data})
+        return data
+
+    def version(self, view, symbols=None):
+        """Versión del snapshot en la que se publicaron los datos de una vista (0 si aún no hay)
+
+        Solo cambia cuando se actualiza esa vista, no con las demás suscripciones.
+        """
+        key = (tuple(self.symbols if symbols is None else symbols), view)
+        return self._snapshot.versions.get(key, 0)
+
+    def view(self, key, build, version):
+        """Datos derivados de una vista (build() se ejecuta una vez por version)
+
+        version es la de la vista que lee build (ver version), leída antes que sus datos.
+        """
+        return self._views.get(key, build, version)
+
+    def stats(self):
+        """Contadores de primeras cargas ejecutadas y agrupadas"""
+        return self._flight.stats()
+
+    def subscriptions(self):
+        """Vistas que se están refrescando: [(vista, número de símbolos)]"""
+        return [(view, len(symbols)) for symbols, view in self._snapshot.data]
+
+    def refresh(self):
+        """Refrescar todas las suscripciones y publicar un nuevo snapshot"""
+        now = time.time()
+        with self._lock:
+            idle = [k for k, t in self._last_read.items() if now - t > self.idle_timeout]
+            for key in idle:
+                del self._last_read[key]
+            keys = list(self._last_read)
+
+        updates = {}
+        self.refreshing = True
+        try:
+            for key in keys:
+                symbols, view = key
+                try:
+                    data = self._load(list(symbols), view)
+                except Exception as e:
+                    # Se sigue sirviendo el último dato bueno de esa vista
+                    logger.warning("Sondeo de %s (%d símbolos) fallido: %s", view, len(symbols), e)
+                    data = {symbol: None for symbol in symbols}
+                updates[key] = self._keep_last_good(key, data)
+        finally:
+            self.refreshing = False
+        with self._lock:
+            for stale_key in [k for k in self._stale if k[0] in idle]:
+                del self._stale[stale_key]
+        if updates or idle:
+            self._publish(updates, drop=idle)
+
+    def _keep_last_good(self, key, data):
+        """Sustituir los símbolos que han fallado por su último dato bueno (marcado como antiguo)"""
+        previous = self._snapshot.data.get(key, {})
+        merged = dict(data)
+        now = time.time()
+        with self._lock:
+            for symbol, value in data.items():
+                symbol_key = (key, symbol)
+                if value is not None:
+                    self._good_at[symbol_key] = now
+                    self._stale.pop(symbol_key, None)
+                elif previous.get(symbol) is not None:
+                    merged[symbol] = previous[symbol]
+                    self._stale[symbol_key] = self._good_at.get(symbol_key)
+        return freeze(merged)
+
+    def stale(self, view=None):
+        """Símbolos servidos con datos antiguos: {símbolo: hora de los últimos datos buenos}
+
+        Sin view, de todas las vistas (la hora más antigua de cada símbolo).
+        """
+        with self._lock:
+            stale = {}
+            for ((_, v), symbol), good_at in self._stale.items():
+                if view is None or v == view:
+                    stale[symbol] = min(good_at, stale.get(symbol, good_at))
+            return stale
+
+    def _publish(self, updates, drop=()):
+        """Publicar un snapshot nuevo con los datos actualizados (sustitución atómica)"""
+        with self._lock:
+            version = self._snapshot.version + 1
+            data = {k: d for k, d in self._snapshot.data.items() if k not in drop}
+            data.update(updates)
+            versions = {k: v for k, v in self._snapshot.versions.items() if k not in drop}
+            versions.update((k, version) for k in updates)
+            self._snapshot = Snapshot(version, time.time(), MappingProxyType(data),
+                                      MappingProxyType(versions))
+
+    def failed_symbols(self):
+        """Símbolos sin datos en alguna vista del último snapshot"""
+        return sorted({symbol for data in self._snapshot.data.values()
+                       for symbol, value in data.items() if value is None})
+
+    def _run(self):
+        """Bucle del sondeo: esperar al siguiente ciclo y refrescar"""
+        while True:
+            wait = self._interval()
+            if (self.failed_symbols() or self._stale) and self._active():
+                wait = min(wait, self.retry_interval)
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Error en el sondeo de datos de mercado")
+
+    def wake(self):
+        """Forzar un ciclo del sondeo inmediatamente"""
+        self._wakeup.set()
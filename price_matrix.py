@@ -0,0 +1,75 @@
+"""
+Matriz de precios alineada (marcas de tiempo x símbolos)
+Los cierres de todos los símbolos en una sola matriz, para normalizar, calcular el
+cambio del período y ordenar el ranking con operaciones de NumPy sobre todas las
+columnas a la vez
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class PriceMatrix:
+    """Cierres de varios símbolos alineados por marca de tiempo (NaN donde un símbolo no tiene barra)
+
+    Se construye una vez por snapshot y no se modifica después, así que se puede
+    compartir entre sesiones.
+    """
+
+    __slots__ = ("index", "symbols", "close", "normalized", "first", "last", "change", "__weakref__")
+
+    def __init__(self, index, symbols, close):
+        self.index = index
+        self.symbols = list(symbols)
+        self.close = close
+        columns = np.arange(close.shape[1])
+        valid = ~np.isnan(close)
+        has_data = valid.any(axis=0)
+        # Primer y último cierre válido de cada columna (la fila 0 si no hay ninguno)
+        first_row = valid.argmax(axis=0) if len(close) else columns
+        last_row = len(close) - 1 - valid[::-1].argmax(axis=0) if len(close) else columns
+        self.first = np.where(has_data, close[first_row, columns], np.nan)
+        self.last = np.where(has_data, close[last_row, columns], np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Rendimiento (%) desde el primer cierre de cada símbolo
+            self.normalized = (close / self.first - 1) * 100
+            self.change = (self.last / self.first - 1) * 100
+
+    @classmethod
+    def from_data(cls, data, symbols):
+        """Construir a partir de los datos de acciones ({símbolo: {"history": ...}})
+
+        Solo entran los símbolos con histórico; las marcas de tiempo son la unión de
+        todas, ordenadas.
+        """
+        histories = [(symbol, data[symbol]["history"]) for symbol in symbols
+                     if data.get(symbol) and len(data[symbol]["history"]) > 0]
+        if not histories:
+            return cls(pd.DatetimeIndex([]), [], np.empty((0, 0)))
+        stamps = [hist.index.asi8 for _, hist in histories]
+        ts = np.unique(np.concatenate(stamps))
+        close = np.full((len(ts), len(histories)), np.nan)
+        for column, ((_, hist), stamp) in enumerate(zip(histories, stamps)):
+            close[np.searchsorted(ts, stamp), column] = hist["Close"].to_numpy(dtype="float64", na_value=np.nan)
+        index = pd.DatetimeIndex(pd.to_datetime(ts, unit="ns", utc=True)).tz_convert(histories[0][1].index.tz)
+        return cls(index, [symbol for symbol, _ in histories], close)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def column(self, symbol):
+        """(filas, rendimientos) de un símbolo: las filas en las que tiene barra (máscara) y sus valores"""
+        i = self.symbols.index(symbol)
+        keep = ~np.isnan(self.close[:, i])
+        return keep, self.normalized[keep, i]
+
+    def ranking(self, top=None):
+        """[(símbolo, cambio %)] de mayor a menor cambio (los top primeros si se indica)"""
+        change = np.where(np.isnan(self.change), -np.inf, self.change)
+        if top is not None and top < len(change):
+            # Solo se ordenan los top mayores
+            order = np.argpartition(-change, top)[:top]
+            order = order[np.argsort(-change[order], kind="stable")]
+        else:
+            order = np.argsort(-change, kind="stable")
+        return [(self.symbols[i], float(self.change[i])) for i in order if not np.isnan(self.change[i])]
@@ -0,0 +1,266 @@
+"""
+Proveedores de datos de mercado
+Interfaz común para obtener históricos OHLCV y datos fundamentales, con una
+implementación sobre yfinance y otra que reproduce datos grabados en disco
+(sin red y con latencia artificial configurable, para pruebas y benchmarks)
+
+Grabar datos para el proveedor de reproducción:
+    python providers.py grabar fixtures AAPL MSFT NVDA
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from yfinance import shared as yf_shared
+
+from compact import Quote
+
+# Columnas que devuelve Ticker.history (se mantienen en los históricos agrupados)
+HISTORY_COLUMNS = ["Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits"]
+
+# Barras diarias que se piden para las cotizaciones (cubren fines de semana y festivos)
+QUOTE_PERIOD = "5d"
+
+# Textos de los errores de red o HTTP que registra yfinance (el resto de errores de
+# una descarga vacía significan que el símbolo no tiene datos)
+TRANSPORT_ERRORS = ("ConnectionError", "Timeout", "HTTPError", "Too Many Requests", "RateLimit")
+
+# Históricos que se graban para el proveedor de reproducción: intervalo -> período
+# (los mismos históricos base que pide market_data; los demás intervalos intradía se
+# sacan remuestreando las barras de 1 minuto)
+RECORDED_INTERVALS = {"1d": "5y", "1m": "5d"}
+
+
+class MarketDataProvider:
+    """Interfaz de los proveedores de datos de mercado"""
+
+    name = "base"
+
+    def history(self, symbols, period=None, interval="1d", start=None):
+        """Histórico OHLCV de varios símbolos en una sola petición
+
+        Devuelve {símbolo: DataFrame} con las columnas de Ticker.history. Con start se
+        devuelven solo las barras desde esa fecha (se ignora period). Los símbolos sin
+        datos tienen un histórico vacío, o se lanza LookupError si no hay ninguno.
+        """
+        raise NotImplementedError
+
+    def info(self, symbol):
+        """Datos fundamentales de un símbolo (con las claves de ticker.info)"""
+        raise NotImplementedError
+
+    def quotes(self, symbols):
+        """Cotizaciones de varios símbolos en una sola petición: {símbolo: Quote}
+
+        Por defecto salen de las barras diarias de los últimos días; los símbolos sin
+        datos no aparecen en el resultado.
+        """
+        histories = self.history(symbols, QUOTE_PERIOD, "1d")
+        return {symbol: Quote.from_daily(hist) for symbol, hist in histories.items() if len(hist) > 0}
+
+
+def split_batch(raw, symbols):
+    """Separar una descarga agrupada de yfinance en un DataFrame por símbolo"""
+    histories = {}
+    grouped = isinstance(raw.columns, pd.MultiIndex)
+    available = set(raw.columns.get_level_values(0)) if grouped else set()
+
+    for symbol in symbols:
+        if grouped:
+            if symbol not in available:
+                histories[symbol] = pd.DataFrame(columns=HISTORY_COLUMNS)
+                continue
+            hist = raw[symbol]
+        else:
+            # Descarga de un único símbolo sin columnas agrupadas
+            hist = raw
+
+        if "Close" not in hist.columns:
+            # Descarga vacía (p. ej. al reintentar solo un símbolo que falla)
+            histories[symbol] = pd.DataFrame(columns=HISTORY_COLUMNS)
+            continue
+        # El índice es la unión de todos los símbolos: quitar las filas sin datos propios
+        hist = hist[[c for c in HISTORY_COLUMNS if c in hist.columns]]
+        histories[symbol] = hist.dropna(subset=["Close"])
+    return histories
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Datos de Yahoo Finance a través de yfinance"""
+
+    name = "yfinance"
+
+    def history(self, symbols, period=None, interval="1d", start=None):
+        raw = yf.download(
+            list(symbols),
+            period=None if start is not None else period,
+            start=start,
+            interval=interval,
+            group_by="ticker",
+            auto_adjust=True,   # Mismos precios ajustados que Ticker.history
+            actions=True,       # Incluir Dividends y Stock Splits
+            ignore_tz=False,    # Mantener el índice con zona horaria
+            progress=False
+        )
+        histories = split_batch(raw, symbols)
+        # yf.download no lanza las excepciones de cada símbolo: las registra y devuelve
+        # descargas vacías. Si no ha llegado nada, un error de red registrado es un fallo
+        # de la petición (se reintenta y cuenta en el circuit breaker); si no, los
+        # símbolos no tienen datos (LookupError: fallan solo ellos y no se reintentan)
+        if all(len(hist) == 0 for hist in histories.values()):
+            # Las versiones de yfinance que guardan los errores los dejan en shared._ERRORS
+            errors = getattr(yf_shared, "_ERRORS", None) or {}
+            detail = "; ".join(f"{s}: {errors[s]}" for s in symbols if s in errors)
+            message = (f"yfinance no ha devuelto datos de {', '.join(symbols)}"
+                       + (f" ({detail})" if detail else ""))
+            if any(marker in str(error) for error in errors.values() for marker in TRANSPORT_ERRORS):
+                raise ConnectionError(message)
+            raise LookupError(message)
+        return histories
+
+    def info(self, symbol):
+        return yf.Ticker(symbol).info
+
+
+def replay_window(hist, period):
+    """Recortar un histórico grabado a un período, contado desde su última barra
+
+    Los períodos en días ("1d", "5d") son sesiones; el resto, meses o años naturales.
+    """
+    if len(hist) == 0 or period is None:
+        return hist
+    if period.endswith("mo"):
+        offset = pd.DateOffset(months=int(period[:-2]))
+    elif period.endswith("y"):
+        offset = pd.DateOffset(years=int(period[:-1]))
+    else:
+        sessions = hist.index.normalize().unique()
+        start = sessions[-min(int(period[:-1]), len(sessions))]
+        return hist.iloc[hist.index.searchsorted(start):]
+    return hist.iloc[hist.index.searchsorted(hist.index[-1] - offset):]
+
+
+def replay_shift(hist, now=None):
+    """Desplazar un histórico grabado para que su última barra sea la más reciente sin pasar de now
+
+    Se suma un número entero de días laborables, así que las barras mantienen su hora y
+    siguen cayendo entre semana. Así las ventanas que se cuentan desde ahora (períodos
+    diarios, almacén local) también encuentran datos en grabaciones antiguas.
+    """
+    if len(hist) == 0:
+        return hist
+    now = pd.Timestamp.now(tz=hist.index.tz) if now is None else now.tz_convert(hist.index.tz)
+    local = hist.index.tz_localize(None)
+    today = np.busday_offset(now.tz_localize(None).date(), 0, roll="backward")
+    days = int(np.busday_count(local[-1].date(), today))
+    if days > 0 and local[-1] + pd.offsets.BDay(days) > now.tz_localize(None):
+        days -= 1
+    if days <= 0:
+        return hist
+    shifted = (local + pd.offsets.BDay(days)).tz_localize(hist.index.tz)
+    return hist.set_axis(shifted.rename(hist.index.name), axis=0)
+
+
+class ReplayProvider(MarketDataProvider):
+    """Reproduce históricos e info grabados en disco (ver record_fixtures)
+
+    Cada llamada espera latency segundos, como si fuera una petición de red, para que
+    las mediciones del camino de descarga sean reproducibles sin conexión. Los históricos
+    se desplazan al leerlos para que terminen ahora (ver replay_shift). Los símbolos
+    sin datos grabados devuelven un histórico vacío y su info lanza KeyError.
+    """
+
+    name = "replay"
+
+    def __init__(self, directory="fixtures", latency=0.0):
+        self.directory = directory
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._frames = {}
+        self.calls = 0
+
+    def _wait(self):
+        """Simular la latencia de una petición"""
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _frame(self, symbol, interval):
+        """Histórico grabado de un símbolo e intervalo (leído una vez y mantenido en memoria)"""
+        key = (symbol, interval)
+        with self._lock:
+            if key in self._frames:
+                return self._frames[key]
+        path = os.path.join(self.directory, f"{symbol}_{interval}.csv")
+        if os.path.exists(path):
+            hist = pd.read_csv(path, index_col=0)
+            hist.index = pd.to_datetime(hist.index, utc=True).tz_convert("America/New_York")
+            hist = replay_shift(hist)
+        else:
+            hist = pd.DataFrame(columns=HISTORY_COLUMNS)
+        with self._lock:
+            self._frames[key] = hist
+        return hist
+
+    def history(self, symbols, period=None, interval="1d", start=None):
+        self._wait()
+        histories = {}
+        for symbol in symbols:
+            hist = self._frame(symbol, interval)
+            if start is not None and len(hist) > 0:
+                hist = hist.iloc[hist.index.searchsorted(pd.Timestamp(start)):]
+            else:
+                hist = replay_window(hist, period)
+            histories[symbol] = hist
+        return histories
+
+    def info(self, symbol):
+        self._wait()
+        path = os.path.join(self.directory, f"{symbol}_info.json")
+        if not os.path.exists(path):
+            raise KeyError(f"sin datos grabados de {symbol}")
+        with open(path, "r") as f:
+            return json.load(f)
+
+
+def record_fixtures(provider, symbols, directory="fixtures"):
+    """Grabar con un proveedor los históricos e info que usa ReplayProvider"""
+    os.makedirs(directory, exist_ok=True)
+    for interval, period in RECORDED_INTERVALS.items():
+        histories = provider.history(symbols, period, interval)
+        for symbol, hist in histories.items():
+            hist.to_csv(os.path.join(directory, f"{symbol}_{interval}.csv"))
+    for symbol in symbols:
+        with open(os.path.join(directory, f"{symbol}_info.json"), "w") as f:
+            json.dump(provider.info(symbol), f, indent=2, default=str)
+
+
+def provider_from_env():
+    """Proveedor configurado con NASDAQ_DATA_PROVIDER ("yfinance" o "replay")
+
+    El proveedor de reproducción lee NASDAQ_REPLAY_DIR (por defecto "fixtures") y
+    NASDAQ_REPLAY_LATENCY (segundos por petición, por defecto 0).
+    """
+    name = os.environ.get("NASDAQ_DATA_PROVIDER", "yfinance")
+    if name == "replay":
+        return ReplayProvider(
+            os.environ.get("NASDAQ_REPLAY_DIR", "fixtures"),
+            float(os.environ.get("NASDAQ_REPLAY_LATENCY", "0"))
+        )
+    if name == "yfinance":
+        return YFinanceProvider()
+    raise ValueError(f"Proveedor de datos desconocido: {name}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4 or sys.argv[1] != "grabar":
+        print("Uso: python providers.py grabar <directorio> <símbolo> [<símbolo> ...]")
+        sys.exit(1)
+    record_fixtures(YFinanceProvider(), sys.argv[3:], sys.argv[2])
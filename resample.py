@@ -0,0 +1,57 @@
+"""
+Remuestreo local de barras OHLCV
+Construye barras de mayor intervalo a partir de las más finas del almacén local,
+sin volver a pedir nada al proveedor
+"""
+
+import numpy as np
+import pandas as pd
+
+# Duración de cada intervalo en minutos ("1d" agrupa por día de la bolsa)
+INTERVAL_MINUTES = {"1m": 1, "2m": 2, "5m": 5, "15m": 15, "30m": 30, "1h": 60, "1d": 1440}
+
+# Las barras se alinean con la apertura (9:30 hora de Nueva York), como las de Yahoo
+SESSION_OPEN_MINUTE = 9 * 60 + 30
+
+
+def resample_ohlcv(hist, interval):
+    """Agrupar barras OHLCV en barras de un intervalo mayor
+
+    Open es el primero, High el máximo, Low el mínimo, Close el último y Volume (y
+    dividendos) la suma de cada grupo. Las barras deben estar ordenadas y en la zona
+    horaria de la bolsa; los grupos se calculan con NumPy sin recorrer las filas.
+    """
+    if len(hist) == 0:
+        return hist
+    step = INTERVAL_MINUTES[interval]
+
+    # Minutos en hora local de la bolsa (sin zona horaria) para alinear con la apertura
+    minutes = hist.index.tz_localize(None).asi8 // 60_000_000_000
+    if step == INTERVAL_MINUTES["1d"]:
+        buckets = minutes // step
+        bucket_start = buckets * step
+    else:
+        buckets = (minutes - SESSION_OPEN_MINUTE) // step
+        bucket_start = buckets * step + SESSION_OPEN_MINUTE
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    if len(starts) == len(hist):
+        return hist
+    ends = np.r_[starts[1:], len(hist)] - 1
+
+    def column(name):
+        if name in hist.columns:
+            return hist[name].to_numpy(dtype="float64", na_value=np.nan)
+        return np.zeros(len(hist))
+
+    index = pd.DatetimeIndex(pd.to_datetime(bucket_start[starts], unit="m")).tz_localize(hist.index.tz)
+    index.name = "Date" if interval == "1d" else "Datetime"
+    resampled = pd.DataFrame({
+        "Open": column("Open")[starts],
+        "High": np.fmax.reduceat(column("High"), starts),
+        "Low": np.fmin.reduceat(column("Low"), starts),
+        "Close": column("Close")[ends],
+        "Volume": np.add.reduceat(np.nan_to_num(column("Volume")), starts),
+        "Dividends": np.add.reduceat(np.nan_to_num(column("Dividends")), starts),
+        "Stock Splits": np.fmax.reduceat(column("Stock Splits"), starts)
+    }, index=index)
+    return resampled[[c for c in resampled.columns if c in hist.columns]]
@@ -0,0 +1,202 @@
+"""
+Llamadas resilientes al proveedor de datos
+Limitador de peticiones (token bucket), reintentos con espera exponencial y
+jitter, y circuit breaker, compartidos por todas las sesiones del proceso
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+
+from providers import MarketDataProvider
+
+logger = logging.getLogger("nasdaq_web")
+
+# Peticiones por segundo al proveedor y ráfaga máxima
+RATE_LIMIT = float(os.environ.get("NASDAQ_RATE_LIMIT", "2"))
+RATE_BURST = int(os.environ.get("NASDAQ_RATE_BURST", "10"))
+
+# Reintentos: número de intentos y espera base/máxima entre ellos (segundos)
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+
+# Circuit breaker: fallos seguidos para abrirlo y segundos que permanece abierto
+BREAKER_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 60
+
+
+class CircuitOpenError(Exception):
+    """El circuito está abierto: no se hacen peticiones al proveedor"""
+
+
+class TokenBucket:
+    """Limitador de peticiones: rate fichas por segundo con un máximo de burst"""
+
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    def acquire(self):
+        """Tomar una ficha, esperando a que haya una disponible"""
+        waited = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    if waited:
+                        self.throttled += 1
+                    return
+                wait_for = (1 - self._tokens) / self.rate
+            waited = True
+            time.sleep(wait_for)
+
+
+class CircuitBreaker:
+    """Circuit breaker: tras threshold fallos seguidos se abre durante reset_timeout segundos
+
+    Pasado ese tiempo queda semiabierto y deja pasar una sola petición de prueba: si va
+    bien se cierra y si falla se vuelve a abrir.
+    """
+
+    CLOSED = "cerrado"
+    OPEN = "abierto"
+    HALF_OPEN = "semiabierto"
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self.rejected = 0
+        self.trips = 0
+
+    @property
+    def state(self):
+        """Estado actual (un circuito abierto pasa a semiabierto al vencer reset_timeout)"""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._trial = False
+            return self._state
+
+    def retry_in(self):
+        """Segundos hasta que se vuelva a probar el proveedor (0 si no está abierto)"""
+        if self.state != self.OPEN:
+            return 0
+        return max(0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def before_call(self):
+        """Comprobar si se puede llamar al proveedor; lanza CircuitOpenError si no"""
+        state = self.state
+        with self._lock:
+            if state == self.OPEN or (state == self.HALF_OPEN and self._trial):
+                self.rejected += 1
+                raise CircuitOpenError("proveedor no disponible temporalmente")
+            if state == self.HALF_OPEN:
+                self._trial = True
+
+    def record_success(self):
+        """Registrar una llamada correcta"""
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("Circuit breaker cerrado: el proveedor vuelve a responder")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial = False
+
+    def record_failure(self):
+        """Registrar una llamada fallida (ya agotados los reintentos)"""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.threshold:
+                if self._state != self.OPEN:
+                    self.trips += 1
+                    logger.warning("Circuit breaker abierto tras %d fallos seguidos", self._failures)
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, maximum=RETRY_MAX_DELAY):
+    """Espera antes del reintento attempt (1, 2, ...): exponencial con jitter completo"""
+    return random.uniform(0, min(maximum, base * 2 ** (attempt - 1)))
+
+
+class ResilientProvider(MarketDataProvider):
+    """Envuelve un proveedor con limitador de peticiones, reintentos y circuit breaker
+
+    Solo los errores de la petición (red, HTTP) se reintentan y cuentan para el circuit
+    breaker; un LookupError (símbolos sin datos) se propaga sin más.
+    """
+
+    def __init__(self, provider, bucket=None, breaker=None, attempts=RETRY_ATTEMPTS):
+        self.provider = provider
+        self.name = provider.name
+        self.bucket = bucket or TokenBucket()
+        self.breaker = breaker or CircuitBreaker()
+        self.attempts = attempts
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+
+    def _call(self, fn, *args):
+        """Ejecutar una petición al proveedor con las protecciones"""
+        self.breaker.before_call()
+        with self._lock:
+            self.calls += 1
+        for attempt in range(1, self.attempts + 1):
+            self.bucket.acquire()
+            try:
+                result = fn(*args)
+            except LookupError:
+                # Símbolos sin datos: el proveedor ha respondido, así que no se reintenta
+                # ni cuenta como fallo en el circuit breaker
+                self.breaker.record_success()
+                raise
+            except Exception as e:
+                if attempt == self.attempts:
+                    self.breaker.record_failure()
+                    raise
+                with self._lock:
+                    self.retries += 1
+                delay = backoff_delay(attempt)
+                logger.info("Petición %s fallida (%s), reintento %d en %.1f s",
+                            fn.__name__, e, attempt, delay)
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def history(self, symbols, period=None, interval="1d", start=None):
+        return self._call(self.provider.history, symbols, period, interval, start)
+
+    def info(self, symbol):
+        return self._call(self.provider.info, symbol)
+
+    def quotes(self, symbols):
+        return self._call(self.provider.quotes, symbols)
+
+    def stats(self):
+        """Estado del circuit breaker y contadores de peticiones, reintentos y esperas"""
+        return {
+            "state": self.breaker.state,
+            "retry_in": self.breaker.retry_in(),
+            "calls": self.calls,
+            "retries": self.retries,
+            "throttled": self.bucket.throttled,
+            "rejected": self.breaker.rejected,
+            "trips": self.breaker.trips
+        }
@@ -0,0 +1,146 @@
+"""
+Índice local de símbolos
+Búsqueda por prefijo (ticker o palabras del nombre) sobre un listado de valores
+guardado en disco, sin llamadas a la red
+
+Actualizar el listado con los archivos de NASDAQ Trader (NASDAQ, NYSE y otros):
+    python symbol_index.py actualizar
+"""
+
+import csv
+import os
+import sys
+import unicodedata
+import urllib.request
+from bisect import bisect_left
+
+SYMBOLS_FILE = os.environ.get("NASDAQ_SYMBOLS_FILE", "symbols.csv")
+
+# Listados oficiales (separados por "|") y su columna de mercado
+NASDAQ_TRADER_URLS = {
+    "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt": None,
+    "https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt": "Exchange",
+}
+
+# Código de mercado de otherlisted.txt -> nombre
+EXCHANGES = {"A": "NYSE American", "N": "NYSE", "P": "NYSE Arca", "Z": "Cboe BZX", "V": "IEX"}
+
+# Carácter mayor que cualquier otro: los prefijos ocupan el rango [prefijo, prefijo + FIN)
+_END = "\U0010ffff"
+
+
+def normalize(text):
+    """Texto para comparar: minúsculas y sin acentos"""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+class SymbolIndex:
+    """Listado de valores con búsqueda por prefijo sobre arrays ordenados
+
+    Se ordenan una vez las claves (tickers y cada palabra del nombre) y cada búsqueda
+    son dos bisecciones, así que responde en microsegundos con decenas de miles de
+    valores.
+    """
+
+    def __init__(self, listings):
+        # listings: [(símbolo, nombre, mercado)] sin repetidos
+        self.listings = []
+        self._rows = {}
+        for symbol, name, exchange in listings:
+            symbol = symbol.strip().upper()
+            if symbol and symbol not in self._rows:
+                self._rows[symbol] = len(self.listings)
+                self.listings.append((symbol, name.strip(), exchange.strip()))
+
+        tickers, words = [], []
+        for row, (symbol, name, _) in enumerate(self.listings):
+            tickers.append((symbol.casefold(), row))
+            for word in set(normalize(name).replace(",", " ").replace(".", " ").split()):
+                words.append((word, row))
+        tickers.sort()
+        words.sort()
+        self._ticker_keys = [k for k, _ in tickers]
+        self._ticker_rows = [r for _, r in tickers]
+        self._word_keys = [k for k, _ in words]
+        self._word_rows = [r for _, r in words]
+
+    def __len__(self):
+        return len(self.listings)
+
+    def get(self, symbol):
+        """(símbolo, nombre, mercado) de un ticker, o None si no está en el listado"""
+        row = self._rows.get(symbol.upper())
+        return None if row is None else self.listings[row]
+
+    @staticmethod
+    def _prefix_rows(keys, rows, prefix, limit):
+        """Filas cuyas claves empiezan por prefix (como mucho limit)"""
+        start = bisect_left(keys, prefix)
+        end = min(bisect_left(keys, prefix + _END, start), start + limit)
+        return rows[start:end]
+
+    def search(self, query, limit=10):
+        """Valores cuyo ticker o alguna palabra del nombre empiezan por query
+
+        Primero el ticker exacto, después los tickers que empiezan por query y por
+        último las coincidencias en el nombre.
+        """
+        query = normalize(query.strip())
+        if not query:
+            return []
+        found = []
+        exact = self._rows.get(query.upper())
+        if exact is not None:
+            found.append(exact)
+        for rows in (self._prefix_rows(self._ticker_keys, self._ticker_rows, query, limit),
+                     self._prefix_rows(self._word_keys, self._word_rows, query.split()[0], limit * 4)):
+            for row in rows:
+                if row not in found:
+                    found.append(row)
+                if len(found) >= limit:
+                    return [self.listings[r] for r in found]
+        return [self.listings[r] for r in found]
+
+
+def load_index(path=SYMBOLS_FILE, extra=()):
+    """Cargar el índice desde un CSV (symbol,name,exchange), añadiendo los valores de extra"""
+    listings = []
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            listings = [(r["symbol"], r["name"], r.get("exchange", "")) for r in csv.DictReader(f)]
+    return SymbolIndex(listings + list(extra))
+
+
+def download_listings():
+    """Descargar los listados de NASDAQ Trader: [(símbolo, nombre, mercado)]"""
+    listings = []
+    for url, exchange_column in NASDAQ_TRADER_URLS.items():
+        with urllib.request.urlopen(url, timeout=30) as response:
+            lines = response.read().decode("utf-8", errors="replace").splitlines()
+        reader = csv.DictReader(lines, delimiter="|")
+        for row in reader:
+            symbol = row.get("Symbol") or row.get("ACT Symbol")
+            # La última línea es la fecha del archivo; se omiten los valores de prueba
+            if not symbol or row.get("Test Issue") == "Y" or symbol.startswith("File Creation"):
+                continue
+            exchange = EXCHANGES.get(row.get(exchange_column), "") if exchange_column else "NASDAQ"
+            listings.append((symbol, row["Security Name"], exchange))
+    return listings
+
+
+def save_listings(listings, path=SYMBOLS_FILE):
+    """Guardar un listado en CSV ordenado por símbolo"""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["symbol", "name", "exchange"])
+        writer.writerows(sorted(set(listings)))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "actualizar":
+        print("Uso: python symbol_index.py actualizar [archivo]")
+        sys.exit(1)
+    listings = download_listings()
+    save_listings(listings, sys.argv[2] if len(sys.argv) > 2 else SYMBOLS_FILE)
+    print(f"{len(listings)} valores guardados")
@@ -0,0 +1,120 @@
+"""
+Universo de símbolos
+Listas de seguimiento (watchlists) cargadas desde un archivo JSON, con el nombre,
+emoji y color de cada símbolo (generados si el archivo no los indica)
+"""
+
+import colorsys
+import json
+import logging
+import os
+import zlib
+
+logger = logging.getLogger("nasdaq_web")
+
+WATCHLISTS_FILE = os.environ.get("NASDAQ_WATCHLISTS_FILE", "watchlists.json")
+
+DEFAULT_EMOJI = "📈"
+
+# Lista que se usa si no existe el archivo de watchlists
+MAGNIFICENT_SEVEN = {
+    "GOOGL": {"name": "Alphabet (Google)", "emoji": "🔍", "color": "#5C9CE5"},  # Azul Google
+    "AMZN": {"name": "Amazon", "emoji": "📦", "color": "#FF9F43"},              # Naranja Amazon
+    "AAPL": {"name": "Apple", "emoji": "🍎", "color": "#A3A8B8"},               # Gris elegante Apple
+    "META": {"name": "Meta (Facebook)", "emoji": "👤", "color": "#0A84FF"},     # Azul Meta
+    "MSFT": {"name": "Microsoft", "emoji": "🪟", "color": "#00D2D3"},           # Turquesa Microsoft
+    "NVDA": {"name": "NVIDIA", "emoji": "🎮", "color": "#78C850"},              # Verde NVIDIA
+    "TSLA": {"name": "Tesla", "emoji": "🚗", "color": "#E84545"}                # Rojo Tesla
+}
+
+
+def symbol_color(symbol):
+    """Color estable para un símbolo (el mismo en todas las listas y sesiones)"""
+    # Proporción áurea sobre un hash del símbolo: tonos repartidos por todo el círculo
+    hue = (zlib.crc32(symbol.encode()) * 0.618033988749895) % 1
+    r, g, b = colorsys.hls_to_rgb(hue, 0.55, 0.65)
+    return f"#{int(r * 255):02X}{int(g * 255):02X}{int(b * 255):02X}"
+
+
+def symbol_metadata(symbol, name=None, emoji=None, color=None):
+    """Metadatos de un símbolo, completando los que falten"""
+    return {
+        "name": name or symbol,
+        "emoji": emoji or DEFAULT_EMOJI,
+        "color": color or symbol_color(symbol)
+    }
+
+
+class Universe:
+    """Conjunto de watchlists y metadatos de todos sus símbolos"""
+
+    def __init__(self, watchlists, default=None, metadata=None):
+        self.watchlists = watchlists
+        self.default = default if default in watchlists else next(iter(watchlists))
+        self._metadata = metadata or {}
+
+    @classmethod
+    def from_dict(cls, config):
+        """Construir a partir del contenido del archivo de watchlists
+
+        Cada símbolo puede ser un texto ("AAPL") o un objeto con symbol y, opcionalmente,
+        name, emoji y color.
+        """
+        watchlists, explicit = {}, {}
+        for name, entries in config["watchlists"].items():
+            symbols = []
+            for entry in entries:
+                if isinstance(entry, str):
+                    entry = {"symbol": entry}
+                symbol = entry["symbol"].upper()
+                if symbol not in symbols:
+                    symbols.append(symbol)
+                # Los metadatos indicados en una lista valen para todas
+                fields = explicit.setdefault(symbol, {})
+                for field in ("name", "emoji", "color"):
+                    if entry.get(field) and field not in fields:
+                        fields[field] = entry[field]
+            watchlists[name] = symbols
+        metadata = {symbol: symbol_metadata(symbol, **fields) for symbol, fields in explicit.items()}
+        return cls(watchlists, config.get("default"), metadata)
+
+    def symbols(self, watchlist=None):
+        """Símbolos de una watchlist (por defecto, la predeterminada)"""
+        return list(self.watchlists.get(watchlist or self.default, []))
+
+    def info(self, symbol):
+        """Nombre, emoji y color de un símbolo (generados si no está en ninguna lista)"""
+        if symbol not in self._metadata:
+            return symbol_metadata(symbol)
+        return self._metadata[symbol]
+
+
+def load_universe(path=WATCHLISTS_FILE):
+    """Cargar las watchlists desde un archivo JSON (o solo Magnificent 7 si no existe)"""
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return Universe.from_dict(json.load(f))
+        except (ValueError, KeyError) as e:
+            logger.warning("Archivo de watchlists %s no válido: %s", path, e)
+    return Universe(
+        {"Magnificent 7": list(MAGNIFICENT_SEVEN)},
+        metadata={symbol: dict(meta) for symbol, meta in MAGNIFICENT_SEVEN.items()}
+    )
+
+
+def add_to_watchlist(watchlist, symbol, name=None, path=WATCHLISTS_FILE):
+    """Añadir un símbolo a una watchlist del archivo (creándolo si no existe)"""
+    config = {"default": "Magnificent 7",
+              "watchlists": {"Magnificent 7": [{"symbol": s, **meta} for s, meta in MAGNIFICENT_SEVEN.items()]}}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    entries = config["watchlists"].setdefault(watchlist, [])
+    symbol = symbol.upper()
+    if any((entry if isinstance(entry, str) else entry["symbol"]).upper() == symbol for entry in entries):
+        return False
+    entries.append({"symbol": symbol, "name": name} if name else symbol)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+    return True